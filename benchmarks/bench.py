@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Micro-benchmarks of the drawille hot paths.
+
+Each benchmark runs at several sizes and pixel densities and reports the best
+time per call. Results can be saved as JSON and compared to a baseline:
+
+    python benchmarks/bench.py                            # print all results
+    python benchmarks/bench.py -k canvas.set -k line      # run some benchmarks
+    python benchmarks/bench.py --json bench.json          # save the results
+    python benchmarks/bench.py --baseline bench.json      # fail on regressions
+
+The comparison exits with status 1 if any benchmark is slower than the
+baseline by more than the `--threshold` (default: 20%).
+"""
+
+from __future__ import print_function
+
+import argparse, json, platform, random, sys, time, timeit
+from array import array
+from collections import OrderedDict
+from drawille import Canvas, ConcurrentCanvas, Turtle, line
+from drawille.canvas import polygon
+
+clock = getattr(time, 'perf_counter', time.time)
+
+benchmarks = OrderedDict()  # name -> (setup function, list of params)
+
+SIZES     = (32, 128, 256)
+DENSITIES = (0.05, 0.5)
+
+def bench(name, **params):
+    """bench registers a setup function, which is called with each combination of
+    the `params` and returns the function to time"""
+    def register(setup):
+        combinations = [{}]
+        for key, values in sorted(params.items()):
+            combinations = [dict(c, **{key: v}) for c in combinations for v in values]
+        benchmarks[name] = (setup, combinations)
+        return setup
+    return register
+
+
+def points(size, density, seed=42):
+    """points returns random pixel coordinates, covering `density` of a size x size area"""
+    rnd = random.Random(seed)
+    return [(rnd.randrange(size), rnd.randrange(size)) for _ in range(int(size * size * density))]
+
+def filled(size, density):
+    c = Canvas()
+    for x, y in points(size, density): c.set(x, y)
+    return c
+
+def each(op, pts):
+    def run():
+        for x, y in pts: op(x, y)
+    return run
+
+
+@bench('canvas.set', size=SIZES, density=DENSITIES)
+def canvas_set(size, density):
+    return each(Canvas().set, points(size, density))
+
+@bench('canvas.unset', size=SIZES, density=DENSITIES)
+def canvas_unset(size, density):
+    # each run unsets all pixels and sets them again, subtract canvas.set for the unset time
+    c, pts = Canvas(), points(size, density)
+    unset, set_ = each(c.unset, pts), each(c.set, pts)
+    def run(): set_(); unset()
+    return run
+
+@bench('canvas.toggle', size=SIZES, density=DENSITIES)
+def canvas_toggle(size, density):
+    return each(filled(size, density).toggle, points(size, density, seed=7))
+
+@bench('canvas.get', size=SIZES, density=DENSITIES)
+def canvas_get(size, density):
+    return each(filled(size, density).get, points(size, density, seed=7))
+
+@bench('canvas.set_buffer', size=SIZES, density=DENSITIES)
+def canvas_set_buffer(size, density):
+    c, buf = Canvas(), array('i', [v for p in points(size, density) for v in p])
+    return lambda: c.set_buffer(buf)
+
+@bench('concurrent.set_pixels', size=SIZES, density=DENSITIES)
+def concurrent_set_pixels(size, density):
+    c, pts = ConcurrentCanvas(), points(size, density)
+    return lambda: c.set_pixels(pts)
+
+@bench('concurrent.frame', size=SIZES, density=DENSITIES)
+def concurrent_frame(size, density):
+    c = ConcurrentCanvas()
+    c.set_pixels(points(size, density))
+    return c.frame
+
+@bench('canvas.set_text', length=(10, 100, 1000))
+def canvas_set_text(length):
+    c, text = Canvas(), 'x' * length
+    return lambda: c.set_text(0, 0, text)
+
+@bench('canvas.rows', size=SIZES, density=DENSITIES)
+def canvas_rows(size, density):
+    c = filled(size, density)
+    return lambda: list(c.rows())
+
+@bench('canvas.rows_bounded', size=SIZES, density=DENSITIES)
+def canvas_rows_bounded(size, density):
+    c, lo, hi = filled(size, density), size // 4, size * 3 // 4
+    return lambda: list(c.rows(lo, lo, hi, hi))
+
+@bench('line', length=(10, 100, 1000))
+def bench_line(length):
+    return lambda: list(line(0, 0, length, length // 3))
+
+@bench('polygon', sides=(4, 16, 64), radius=(10, 100))
+def bench_polygon(sides, radius):
+    return lambda: list(polygon(0, 0, sides, radius))
+
+@bench('turtle.forward', step=(1, 10, 100))
+def turtle_forward(step):
+    t = Turtle()
+    def run():
+        t.clear()
+        for _ in range(100): t.forward(step); t.right(37)
+        t.flush()
+    return run
+
+
+def turtille():
+    from drawille.repl import Turtille
+    tur = Turtille(use_cache=False)
+    return tur
+
+def library(funcs):
+    return '\n'.join('fn{0} -> f {0} r 45 fn{1}'.format(i, i - 1) if i else 'fn0 -> f 1 r 90'
+                     for i in range(funcs))
+
+@bench('turtille.parse', funcs=(10, 100, 1000))
+def turtille_parse(funcs):
+    tur, text = turtille(), library(funcs)
+    return lambda: tur.parse(text)
+
+@bench('turtille.run_program', depth=(1, 10, 50), repeat=(1, 100))
+def turtille_run(depth, repeat):
+    tur = turtille()
+    tur.parse(library(depth))
+    program = [('clear', ()), ('repeat', (repeat, (('fn{}'.format(depth - 1),),)))]
+    def run():
+        tur.run_program(program)
+        tur.turtle.flush()
+    return run
+
+
+def measure(fn, min_time=0.2, repeat=3):
+    """measure returns the best time per call in seconds, using enough calls per
+    repetition to run at least `min_time` seconds"""
+    timer, number = timeit.Timer(fn, timer=clock), 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time / repeat: break
+        number *= 10 if elapsed < min_time / 100 else 2
+    return min([elapsed] + timer.repeat(repeat - 1, number)) / number
+
+def key(name, params):
+    return '{}[{}]'.format(name, ','.join('{}={}'.format(k, v) for k, v in sorted(params.items())))
+
+def run(selected=(), min_time=0.2):
+    """run runs the selected benchmarks (all if none are selected) and yields their
+    keys and times. Benchmarks that cannot run, e.g., without lark, are skipped."""
+    for name, (setup, combinations) in benchmarks.items():
+        if selected and not any(s in name for s in selected): continue
+        for params in combinations:
+            try:              fn = setup(**params)
+            except ImportError as err:
+                print('skipping {}: {}'.format(name, err), file=sys.stderr)
+                break
+            yield key(name, params), measure(fn, min_time)
+
+def compare(results, baseline, threshold):
+    """compare returns the keys of the results slower than the baseline by more than `threshold`"""
+    return [k for k, t in results.items() if k in baseline and t > baseline[k] * (1 + threshold)]
+
+def main():
+    p = argparse.ArgumentParser(description='run the drawille micro-benchmarks'); add = p.add_argument
+    add('-k',          help='run benchmarks with names containing the text', action='append', default=[], dest='selected')
+    add('--json',      help='save the results as JSON file')
+    add('--baseline',  help='compare the results with a JSON file saved by --json')
+    add('--threshold', help='allowed slowdown compared to the baseline (default: 0.2)', type=float, default=0.2)
+    add('--min-time',  help='minimum time per benchmark in seconds (default: 0.2)',     type=float, default=0.2)
+    args = p.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f: baseline = json.load(f)['results']
+
+    results = OrderedDict()
+    for k, t in run(args.selected, args.min_time):
+        results[k] = t
+        ratio = '{:8.2f}x'.format(t / baseline[k]) if k in baseline else ''
+        print('{:<60} {:12.3f} us {}'.format(k, t * 1e6, ratio))
+        sys.stdout.flush()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(python=platform.python_version(), implementation=platform.python_implementation(),
+                           results=results), f, indent=2)
+
+    regressions = compare(results, baseline, args.threshold)
+    for k in regressions:
+        print('REGRESSION: {} {:.3f} us -> {:.3f} us'.format(k, baseline[k] * 1e6, results[k] * 1e6))
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Frame rate harness running drawille animations under a pseudo-terminal.
+
+Each target is run headless in a child process, attached to a pty with a
+fake terminal size. The child reports the start and end of each animation
+tick through a pipe, using the tick hooks of :class:`drawille.stats.CanvasStats`,
+and the harness records when and how many bytes arrive at the pty:
+
+    python benchmarks/fps.py                                  # all targets
+    python benchmarks/fps.py sine_tracking --frames 200
+    python benchmarks/fps.py examples/flower.tur --size 120x40 --json fps.json
+
+Targets are `sine_tracking`, `rotating_cube`, `turtille`, or the path of any
+Python file using :func:`drawille.animate` or a Turtille file using `animate`.
+For each target, the report shows the achieved frames per second, the bytes
+written per frame, the time per tick, and the latency from the start of a tick
+(when its pixels are set) to the arrival of its last byte at the terminal.
+"""
+
+from __future__ import print_function
+
+import argparse, errno, fcntl, json, os, select, struct, subprocess, sys, termios, time
+
+here = os.path.dirname(os.path.abspath(__file__))
+root = os.path.dirname(here)
+
+targets = {
+    'sine_tracking': os.path.join(root, 'examples', 'sine_tracking.py'),
+    'rotating_cube': os.path.join(root, 'examples', 'rotating_cube.py'),
+    'turtille':      'fr90 -> f 20 r 90\nrect -> 4 * fr90\nrec45 -> rect r 45\nflower10 -> clear 8 * rec45 r 10\n',
+}
+
+class Done(Exception): pass
+
+
+def child(target, frames, fd):
+    """child runs the target, writing 'tick start end' lines to the file descriptor `fd`,
+    and stops the animation after the given number of frames"""
+    from drawille import Canvas
+    from drawille.stats import CanvasStats
+
+    out = os.fdopen(fd, 'w')
+    starts = {}
+    def hook(event, canvas, tick=None, **info):
+        if   event == 'before_tick': starts[tick] = time.time()
+        elif event == 'after_tick':
+            out.write('{} {!r} {!r}\n'.format(tick, starts.pop(tick), time.time()))
+            if tick >= frames: raise Done()
+
+    # the class attribute is used by all canvases: ticks are reported without wrapping any canvas methods
+    Canvas.stats = CanvasStats()
+    Canvas.stats.add_hook(hook)
+    try:
+        path = targets.get(target, target)
+        if path.endswith('.py'):
+            import runpy
+            sys.argv = [path]
+            runpy.run_path(path, run_name='__main__')
+        else:
+            from drawille.repl import Turtille
+            tur = Turtille(use_cache=False)
+            if os.path.exists(path): program = tur.load(path, silent=True)
+            else:                    program = tur.parse(path + 'animate flower10')
+            tur.run_program(program)
+    except Done:
+        pass
+    finally:
+        out.close()
+
+
+def spawn(target, frames, cols, rows):
+    """spawn runs the target in a child process attached to a pty and returns
+    the chunks read from the pty as (time, bytes) tuples and the child's ticks"""
+    master, slave = os.openpty()
+    fcntl.ioctl(slave, termios.TIOCSWINSZ, struct.pack('HHHH', rows, cols, 0, 0))
+    r, w = os.pipe()
+    if hasattr(os, 'set_inheritable'): os.set_inheritable(w, True)  # Python 3 pipes are not inherited
+    env = dict(os.environ, COLUMNS=str(cols), LINES=str(rows), TERM=os.environ.get('TERM', 'xterm'),
+               PYTHONPATH=os.pathsep.join(p for p in (root, os.environ.get('PYTHONPATH')) if p))
+    cmd = [sys.executable, os.path.abspath(__file__), '--child', target, '--frames', str(frames), '--fd', str(w)]
+    proc = subprocess.Popen(cmd, stdin=slave, stdout=slave, stderr=slave, env=env,
+                            close_fds=False, preexec_fn=os.setsid)
+    os.close(slave)
+    os.close(w)
+
+    chunks = []
+    while True:
+        ready, _, _ = select.select([master], [], [], 0.1)
+        if not ready:
+            if proc.poll() is not None: break
+            continue
+        try:              data = os.read(master, 65536)
+        except OSError as err:
+            if err.errno != errno.EIO: raise
+            break  # the child closed the pty
+        if not data: break
+        chunks.append((time.time(), data))
+    proc.wait()
+    os.close(master)
+
+    with os.fdopen(r) as f: lines = f.read().split('\n')
+    ticks = [(int(n), float(start), float(end)) for n, start, end in (line.split() for line in lines if line)]
+    if proc.returncode != 0 or not ticks:
+        output = b''.join(data for _, data in chunks).decode('utf-8', 'replace')
+        raise RuntimeError('{} failed with status {}:\n{}'.format(target, proc.returncode, output[-2000:]))
+    return chunks, ticks
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+def report(target, chunks, ticks):
+    """report assigns the chunks to the ticks started before they arrived and
+    returns the frame rate, output volume, and timing stats of the run"""
+    sizes, last = [0] * len(ticks), [None] * len(ticks)
+    i = 0
+    for t, data in chunks:
+        while i + 1 < len(ticks) and ticks[i + 1][1] <= t: i += 1
+        if t < ticks[0][1]: continue  # terminal setup before the first tick
+        sizes[i] += len(data)
+        last[i] = t
+
+    durations = [end - start for _, start, end in ticks]
+    latencies = [t - start for (_, start, _), t in zip(ticks, last) if t is not None]
+    elapsed = ticks[-1][2] - ticks[0][1]
+    return dict(target=target, frames=len(ticks),
+                fps=len(ticks) / elapsed if elapsed > 0 else 0.0,
+                bytes=sum(sizes),
+                bytes_per_frame=sum(sizes) / float(len(ticks)),
+                max_bytes_per_frame=max(sizes),
+                tick_ms=1000 * sum(durations) / len(durations),
+                tick_ms_p95=1000 * percentile(durations, 0.95),
+                latency_ms=1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+                latency_ms_p95=1000 * percentile(latencies, 0.95))
+
+
+def main():
+    p = argparse.ArgumentParser(description='measure the frame rate of drawille animations in a pty'); add = p.add_argument
+    add('targets',  help='targets to run (default: all)', nargs='*', metavar='TARGET')
+    add('--frames', help='number of frames per target (default: 100)', type=int, default=100)
+    add('--size',   help='terminal size as COLSxROWS (default: 120x40)', default='120x40')
+    add('--json',   help='save the reports as JSON file')
+    add('--child',  help=argparse.SUPPRESS)
+    add('--fd',     help=argparse.SUPPRESS, type=int)
+    args = p.parse_args()
+
+    if args.child: return child(args.child, args.frames, args.fd)
+
+    cols, rows = (int(v) for v in args.size.split('x'))
+    reports = []
+    print('{:<16} {:>7} {:>8} {:>12} {:>10} {:>10} {:>12} {:>12}'.format(
+        'target', 'frames', 'fps', 'bytes/frame', 'tick ms', 'tick p95', 'latency ms', 'latency p95'))
+    for target in args.targets or sorted(targets):
+        r = report(target, *spawn(target, args.frames, cols, rows))
+        reports.append(r)
+        print('{target:<16} {frames:>7} {fps:>8.1f} {bytes_per_frame:>12.0f} {tick_ms:>10.2f} '
+              '{tick_ms_p95:>10.2f} {latency_ms:>12.2f} {latency_ms_p95:>12.2f}'.format(**r))
+
+    if args.json:
+        with open(args.json, 'w') as f: json.dump(dict(size=args.size, reports=reports), f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,25 @@
 # flake8: noqa: F401
+import sys
 from drawille.canvas import Canvas, line, animate, get_terminal_size
 from drawille.turtle import Turtle
-from drawille.repl import Turtille
-from drawille.cli import main
+from drawille.plot import Plot, DensityCanvas
+from drawille.concurrent import ConcurrentCanvas
+
+# The Turtille REPL depends on lark, prompt_toolkit and pygments. It is only
+# imported on first access, so that using the canvas does not load them.
+lazy = {
+    'Turtille': 'drawille.repl',
+    'main':     'drawille.cli',
+}
+
+def __getattr__(name):
+    if name not in lazy: raise AttributeError("module 'drawille' has no attribute '{}'".format(name))
+    import importlib
+    value = getattr(importlib.import_module(lazy[name]), name)
+    globals()[name] = value
+    return value
+
+if sys.version_info < (3, 7):
+    # module-level __getattr__ is not supported (PEP 562)
+    from drawille.repl import Turtille
+    from drawille.cli import main
@@ -6,7 +6,8 @@
 from __future__ import absolute_import
 from builtins import super
 
-import math, os, curses, time, sys
+import math, os, time, sys, struct, zlib
+from array import array
 from collections import defaultdict
 
 try:                from shutil import get_terminal_size            # noqa
@@ -33,9 +34,16 @@ pixel_map = ((0x01, 0x08),
              (0x04, 0x20),
              (0x40, 0x80))
 
+# typecodes of the interleaved x, y coordinate formats of :meth:`Canvas.set_buffer`
+buffer_formats = {'hh': 'h', 'ii': 'i', 'ff': 'f'}
+
 # braille unicode characters starts at 0x2800
 braille_char_offset = 0x2800
 
+# bits of the left and right dot of each cell value, for each of the 4 pixel rows of a cell
+dot_bits = tuple(tuple('{0}{1}'.format(int(bool(m & left)), int(bool(m & right))) for m in range(256))
+                 for left, right in pixel_map)
+
 def iround(coord):
     T = type(coord)
     if   T is int:   return coord
@@ -54,6 +62,8 @@ def IntDict2d(): return defaultdict(IntDict)
 class Canvas(object):
     """Canvas implements the pixel surface."""
 
+    stats = None  # :class:`drawille.stats.CanvasStats` if enabled
+
     def __init__(self, line_ending=os.linesep):
         super().__init__()
         self.clear()
@@ -79,6 +89,70 @@ class Canvas(object):
             self.chars[row][col] |= pixel_map[y % 4][x % 2]
 
 
+    def set_pixels(self, points):
+        """Set many pixels of the :class:`Canvas` object at once.
+        Unlike :meth:`set`, coordinates are not rounded and must be integers.
+
+        :param points: iterable of integer (x, y) pixel coordinates
+        """
+        chars = self.chars
+
+        for x, y in points:
+            row = chars[y >> 2]
+            char = row[x >> 1]
+            if type(char) is int:
+                row[x >> 1] = char | pixel_map[y & 3][x & 1]
+
+
+    def set_buffer(self, buf, format='ii', stride=None):
+        """Set the pixels of interleaved x, y coordinates read directly from an
+        object supporting the buffer protocol, e.g., `bytes`, `array`, `mmap`,
+        or `memoryview`, without unpacking the coordinates into lists.
+        Float coordinates are rounded the same way as in :meth:`set`.
+
+        :param buf: buffer with native-endian coordinates
+        :param format: coordinate format: 'hh' (int16), 'ii' (int32), or 'ff' (float32)
+        :param stride: (optional) bytes per record, if records contain more than the x, y coordinates
+        """
+        code = buffer_formats.get(format)
+        if code is None:
+            raise ValueError("Unsupported buffer format <{0}>".format(format))
+        if IS_PY2:
+            values = array(code)
+            values.fromstring(bytes(memoryview(buf)))
+        else:
+            values = memoryview(buf).cast('B').cast(code)
+        step = 2
+        if stride is not None:
+            step, rest = divmod(stride, values.itemsize)
+            if rest or step < 2:
+                raise ValueError("Stride <{0}> must be a multiple of the size of the x, y coordinates".format(stride))
+        xs, ys = values[0::step], values[1::step]
+        if code == 'f':
+            if IS_PY2: xs, ys = map(int, map(round, xs)), map(int, map(round, ys))
+            else:      xs, ys = map(round, xs), map(round, ys)
+        self.set_pixels(zip(xs, ys))
+
+
+    def stamp(self, template, x, y):
+        """Set the pixels of a :class:`drawille.shapes.Template` centered at
+        the integer coordinates x, y, combining them per braille cell.
+
+        :param template: :class:`drawille.shapes.Template` object
+        :param x: x coordinate of the template center
+        :param y: y coordinate of the template center
+        """
+        chars = self.chars
+        col, row = x >> 1, y >> 2
+
+        for drow, cells in template.masks(x & 1, y & 3):
+            chars_row = chars[row + drow]
+            for dcol, mask in cells:
+                char = chars_row[col + dcol]
+                if type(char) is int:
+                    chars_row[col + dcol] = char | mask
+
+
     def unset(self, x, y):
         """Unset a pixel of the :class:`Canvas` object.
 
@@ -190,6 +264,93 @@ class Canvas(object):
         else:      return ret
 
 
+    def enable_stats(self, stats=None):
+        """Count the pixel operations and measure the rendering of this canvas,
+        see :mod:`drawille.stats`. Returns the :class:`CanvasStats` object.
+
+        :param stats: (optional) :class:`drawille.stats.CanvasStats` object to use
+        """
+        from drawille.stats import CanvasStats
+        self.disable_stats()
+        self.stats = CanvasStats() if stats is None else stats
+        self.stats.install(self)
+        return self.stats
+
+
+    def disable_stats(self):
+        """Stop counting and measuring, see :meth:`enable_stats`."""
+        if self.stats is not None: self.stats.uninstall(self)
+        self.stats = None
+
+
+    def raster(self, min_x=None, min_y=None, max_x=None, max_y=None, invert=False):
+        """Returns width, height and the packed 1-bit pixel rows of the
+        :class:`Canvas` object, with a 1-bit for each set pixel (or each unset
+        pixel if `invert` is True). Text cells are rasterized as fully set cells.
+        The bounds are rounded to whole cells, as in :meth:`frame`.
+        An empty canvas without bounds is rasterized as an empty image.
+        """
+        chars = self.chars
+        if not chars and min_x is None and min_y is None and max_x is None and max_y is None:
+            return 0, 0, []
+
+        minrow = mincol = 0
+        maxrow = maxcol = 0
+
+        if chars:
+            minrow = min(chars.keys())
+            maxrow = max(chars.keys())
+            mincol = min(min(x.keys()) for x in chars.values())
+            maxcol = max(max(x.keys()) for x in chars.values())
+
+        if min_y is not None: minrow =  min_y      // 4
+        if max_y is not None: maxrow = (max_y - 1) // 4
+        if min_x is not None: mincol =  min_x      // 2
+        if max_x is not None: maxcol = (max_x - 1) // 2
+
+        width  = max(maxcol - mincol + 1, 0) * 2
+        height = max(maxrow - minrow + 1, 0) * 4
+        cols = range(mincol, maxcol + 1)
+        lines = []
+
+        for rownum in range(minrow, maxrow + 1):
+            row = chars.get(rownum, {})
+            masks = [c if type(c) is int else 0xFF for c in (row.get(x, 0) for x in cols)]
+            if invert: masks = [m ^ 0xFF for m in masks]
+            for bits in dot_bits:
+                lines.append(pack_bits(''.join(map(bits.__getitem__, masks))))
+
+        return width, height, lines
+
+
+    def to_pbm(self, min_x=None, min_y=None, max_x=None, max_y=None):
+        """Binary PBM image (P4) of the :class:`Canvas` object pixels, see :meth:`frame`."""
+        width, height, lines = self.raster(min_x, min_y, max_x, max_y)
+        return 'P4\n{0} {1}\n'.format(width, height).encode() + b''.join(lines)
+
+
+    def to_png(self, min_x=None, min_y=None, max_x=None, max_y=None):
+        """1-bit grayscale PNG image of the :class:`Canvas` object pixels, drawing
+        set pixels black on white, see :meth:`frame`."""
+        width, height, lines = self.raster(min_x, min_y, max_x, max_y, invert=True)
+        if width == 0 or height == 0: raise ValueError('cannot create empty PNG image')
+
+        def chunk(tag, data):
+            crc = zlib.crc32(tag + data) & 0xffffffff
+            return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', crc)
+
+        header = struct.pack('>IIBBBBB', width, height, 1, 0, 0, 0, 0)
+        data = zlib.compress(b''.join(b'\x00' + line for line in lines))
+        return b''.join((b'\x89PNG\r\n\x1a\n', chunk(b'IHDR', header), chunk(b'IDAT', data), chunk(b'IEND', b'')))
+
+
+def pack_bits(bits):
+    """Convert a string of '0' and '1' characters to bytes, padding it with zeros."""
+    bits += '0' * (-len(bits) % 8)
+    if IS_PY2: return bytes(bytearray(int(bits[i:i+8], 2) for i in range(0, len(bits), 8)))
+    else:      return int(bits, 2).to_bytes(len(bits) // 8, 'big')
+
+
 def line(x1, y1, x2, y2):
     """Yields the pixel coordinates of the line between (x1, y1), (x2, y2)
 
@@ -220,18 +381,173 @@ def line(x1, y1, x2, y2):
         yield (x1 + i * dx, y1 + i * dy)
 
 
+def line_pixels(x1, y1, x2, y2):
+    """Returns the integer pixel coordinates drawn for :func:`line`, i.e., the
+    rounded coordinates of its points, computed with integer arithmetic.
+    Points exactly halfway between two pixels are rounded exactly, where
+    :func:`line` may round them either way due to float errors.
+
+    :param x1: x coordinate of the startpoint
+    :param y1: y coordinate of the startpoint
+    :param x2: x coordinate of the endpoint
+    :param y2: y coordinate of the endpoint
+    """
+    x1 = iround(x1)
+    y1 = iround(y1)
+    x2 = iround(x2)
+    y2 = iround(y2)
+
+    r = max(abs(x2 - x1), abs(y2 - y1))
+    if r == 0: return []
+    return list(zip(dda(x1, x2 - x1, r), dda(y1, y2 - y1, r)))
+
+
+def dda(start, diff, steps):
+    """Returns the coordinates `start + i * diff / steps` for i in 0..steps,
+    rounded the same way as :func:`iround` rounds floats."""
+    if diff == 0:      return [start] * (steps + 1)
+    if diff == steps:  return range(start, start + steps + 1)
+    if diff == -steps: return range(start, start - steps - 1, -1)
+
+    # round(v) for v = n / (2 * steps) - 0.5, ties are the values with a remainder of 0
+    r2 = 2 * steps
+    n0 = 2 * start * steps + steps
+    ns = range(n0, n0 + 2 * diff * (steps + 1), 2 * diff)
+    if IS_PY2: return [q - 1 if m == 0 and q <= 0 else q for q, m in map(divmod, ns, [r2] * (steps + 1))]
+    else:      return [q - 1 if m == 0 and q & 1 else q for q, m in map(divmod, ns, [r2] * (steps + 1))]
+
+
+def iline(x1, y1, x2, y2):
+    """Yields the integer pixel coordinates of the line between (x1, y1), (x2, y2)
+    using Bresenham's algorithm. Unlike :func:`line`, both end points are always
+    included, i.e., a line with zero length yields a single pixel.
+
+    :param x1: x coordinate of the startpoint
+    :param y1: y coordinate of the startpoint
+    :param x2: x coordinate of the endpoint
+    :param y2: y coordinate of the endpoint
+    """
+    x1 = iround(x1)
+    y1 = iround(y1)
+    x2 = iround(x2)
+    y2 = iround(y2)
+
+    dx = abs(x2 - x1)
+    dy = -abs(y2 - y1)
+    xdir = 1 if x1 <= x2 else -1
+    ydir = 1 if y1 <= y2 else -1
+    err = dx + dy
+
+    while True:
+        yield x1, y1
+        if x1 == x2 and y1 == y2: return
+        e2 = 2 * err
+        if e2 >= dy: err += dy; x1 += xdir
+        if e2 <= dx: err += dx; y1 += ydir
+
+
+def polyline(points):
+    """Yields the integer pixel coordinates of the connected line segments
+    through the given points, without repeating the shared end points.
+
+    :param points: iterable of (x, y) coordinates
+    """
+    prev = None
+    for x, y in points:
+        x, y = iround(x), iround(y)
+        if prev is None:
+            yield x, y
+        elif prev != (x, y):
+            segment = iline(prev[0], prev[1], x, y)
+            next(segment)
+            for p in segment: yield p
+        prev = (x, y)
+
+
+def flatten_cubic(x0, y0, x1, y1, x2, y2, x3, y3, tolerance=1.0, max_depth=16):
+    """Returns the points of a polyline that approximates a cubic Bézier curve
+    with a maximum distance of `tolerance`, subdividing the curve only where needed.
+
+    :param x0, y0: startpoint
+    :param x1, y1: first control point
+    :param x2, y2: second control point
+    :param x3, y3: endpoint
+    :param tolerance: (optional) maximum distance between curve and polyline
+    :param max_depth: (optional) maximum number of subdivisions
+    """
+    limit = 16.0 * tolerance * tolerance
+    points = [(x0, y0)]
+    stack = [(x0, y0, x1, y1, x2, y2, x3, y3, 0)]
+
+    while stack:
+        x0, y0, x1, y1, x2, y2, x3, y3, depth = stack.pop()
+        ux = max((3.0 * x1 - 2.0 * x0 - x3) ** 2, (3.0 * x2 - x0 - 2.0 * x3) ** 2)
+        uy = max((3.0 * y1 - 2.0 * y0 - y3) ** 2, (3.0 * y2 - y0 - 2.0 * y3) ** 2)
+
+        if ux + uy <= limit or depth >= max_depth:
+            points.append((x3, y3))
+            continue
+
+        # de Casteljau split at t=0.5, push the second half first to process the first half next
+        ax, ay = (x0 + x1) / 2.0, (y0 + y1) / 2.0
+        bx, by = (x1 + x2) / 2.0, (y1 + y2) / 2.0
+        cx, cy = (x2 + x3) / 2.0, (y2 + y3) / 2.0
+        abx, aby = (ax + bx) / 2.0, (ay + by) / 2.0
+        bcx, bcy = (bx + cx) / 2.0, (by + cy) / 2.0
+        mx, my = (abx + bcx) / 2.0, (aby + bcy) / 2.0
+        stack.append((mx, my, bcx, bcy, cx, cy, x3, y3, depth + 1))
+        stack.append((x0, y0, ax, ay, abx, aby, mx, my, depth + 1))
+
+    return points
+
+
+def quadratic_bezier(x1, y1, cx, cy, x2, y2, tolerance=1.0):
+    """Yields the pixel coordinates of the quadratic Bézier curve from (x1, y1)
+    to (x2, y2) with the control point (cx, cy).
+
+    :param tolerance: (optional) maximum distance in pixels between curve and drawn segments
+    """
+    c1x, c1y = x1 + 2.0 / 3.0 * (cx - x1), y1 + 2.0 / 3.0 * (cy - y1)
+    c2x, c2y = x2 + 2.0 / 3.0 * (cx - x2), y2 + 2.0 / 3.0 * (cy - y2)
+    return polyline(flatten_cubic(x1, y1, c1x, c1y, c2x, c2y, x2, y2, tolerance))
+
+
+def cubic_bezier(x1, y1, c1x, c1y, c2x, c2y, x2, y2, tolerance=1.0):
+    """Yields the pixel coordinates of the cubic Bézier curve from (x1, y1)
+    to (x2, y2) with the control points (c1x, c1y) and (c2x, c2y).
+
+    :param tolerance: (optional) maximum distance in pixels between curve and drawn segments
+    """
+    return polyline(flatten_cubic(x1, y1, c1x, c1y, c2x, c2y, x2, y2, tolerance))
+
+
+def catmull_rom(points, tolerance=1.0):
+    """Yields the pixel coordinates of a Catmull-Rom spline passing through all
+    given points. Each spline segment is drawn as an equivalent cubic Bézier curve.
+
+    :param points: list of (x, y) coordinates
+    :param tolerance: (optional) maximum distance in pixels between curve and drawn segments
+    """
+    points = list(points)
+    if len(points) < 3: return polyline(points)
+
+    padded = [points[0]] + points + [points[-1]]
+    flat = [points[0]]
+    for (x0, y0), (x1, y1), (x2, y2), (x3, y3) in zip(padded, padded[1:], padded[2:], padded[3:]):
+        c1x, c1y = x1 + (x2 - x0) / 6.0, y1 + (y2 - y0) / 6.0
+        c2x, c2y = x2 - (x3 - x1) / 6.0, y2 - (y3 - y1) / 6.0
+        flat.extend(flatten_cubic(x1, y1, c1x, c1y, c2x, c2y, x2, y2, tolerance)[1:])
+    return polyline(flat)
+
+
 def polygon(center_x=0, center_y=0, sides=4, radius=4):
     degree = 360.0 / float(sides)
     dr = float(radius + 1) / 2.0
+    points = [((center_x + math.cos(math.radians(n * degree))) * dr,
+               (center_y + math.sin(math.radians(n * degree))) * dr)
+              for n in range(sides + 1)]
 
-    for n in range(sides):
-        a = n * degree
-        b = (n + 1) * degree
-        x1 = (center_x + math.cos(math.radians(a))) * dr
-        y1 = (center_y + math.sin(math.radians(a))) * dr
-        x2 = (center_x + math.cos(math.radians(b))) * dr
-        y2 = (center_y + math.sin(math.radians(b))) * dr
-
+    for (x1, y1), (x2, y2) in zip(points, points[1:]):
         for x, y in line(x1, y1, x2, y2):
             yield x, y
 
@@ -239,11 +555,17 @@ def polygon(center_x=0, center_y=0, sides=4, radius=4):
 def animate(canvas, fn, delay=1.0/24.0, *args, **kwargs):
     """Animation automation function
 
+    Frames are clipped to the terminal, which is measured again after it was resized.
+
     :param canvas: :class:`Canvas` object
     :param fn: Callable. Frame coord generator
     :param delay: Float. Delay between frames.
+    :param bounds: Tuple. Optional keyword-only (min_x, min_y, max_x, max_y) bounds of the frames.
     :param *args, **kwargs: optional fn parameters
     """
+    bounds = kwargs.pop('bounds', ())
+    import curses
+    from drawille.screen import TerminalSession
 
     # python2 unicode curses fix
     if IS_PY2:
@@ -251,17 +573,60 @@ def animate(canvas, fn, delay=1.0/24.0, *args, **kwargs):
         locale.setlocale(locale.LC_ALL, "")
 
     def animation(stdscr):
+        size = session.size
 
         for frame in fn(*args, **kwargs):
+            stats = canvas.stats
+            if stats is not None: stats.begin_tick(canvas)
+
             for x,y in frame:
                 canvas.set(x,y)
 
-            f = canvas.frame()
-            stdscr.addstr(0, 0, '{0}\n'.format(f))
+            if session.size != size:
+                size = session.size
+                curses.resizeterm(size[1], size[0])
+
+            # the last line is kept free, since curses cannot write the last cell of the screen
+            f = canvas.frame(*session.fit(canvas, *bounds))
+            stdscr.erase()
+            for i, line in enumerate(f.splitlines()):
+                stdscr.addstr(i, 0, line)
             stdscr.refresh()
+            if stats is not None: stats.end_tick(canvas)
             if delay:
                 time.sleep(delay)
             canvas.clear()
 
-    curses.wrapper(animation)
+    # the SIGWINCH handler of the session is installed before curses starts,
+    # so that curses does not install its own
+    with TerminalSession(reserve=1) as session:
+        curses.wrapper(animation)
+
+
+
+def export_frames(canvas, fn, pattern='frame{0:04d}.png', *args, **kwargs):
+    """Animation export function. Writes each frame to an image file
+    instead of the terminal, see :func:`animate`.
+
+    :param canvas: :class:`Canvas` object
+    :param fn: Callable. Frame coord generator
+    :param pattern: String. File name pattern, formatted with the frame number.
+                    Files ending with '.pbm' are written as PBM, all others as PNG.
+    :param bounds: Tuple. Optional keyword-only (min_x, min_y, max_x, max_y) bounds of the images.
+    :param *args, **kwargs: optional fn parameters
+    """
+    bounds = kwargs.pop('bounds', ())
+    filenames = []
+
+    for i, frame in enumerate(fn(*args, **kwargs)):
+        for x,y in frame:
+            canvas.set(x,y)
+
+        filename = pattern.format(i)
+        if filename.lower().endswith('.pbm'): data = canvas.to_pbm(*bounds)
+        else:                                 data = canvas.to_png(*bounds)
+        with open(filename, 'wb') as f: f.write(data)
+        filenames.append(filename)
+        canvas.clear()
 
+    return filenames
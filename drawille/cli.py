@@ -3,27 +3,80 @@
 # (C) 2019, Uwe Jugel, @ubunatic
 # License: GNU AGPL (see LICENSE file or http://www.gnu.org/licenses)
 
-from drawille.repl import Turtille, StopTurtille
-import argparse, logging, sys
+import argparse, json, logging, sys, time
+
+clock = getattr(time, 'perf_counter', time.time)
+
+def run(tur, program, profile=False, profile_json=None):
+    """run runs the program, printing its profile if `profile` is set
+    and saving the profile as JSON if `profile_json` is a filename"""
+    if not profile and profile_json is None: return tur.run_program(program)
+    profiler = tur.run_profiled(program)
+    if profile: tur.print_text(profiler.format())
+    if profile_json is not None:
+        with open(profile_json, 'w') as f: json.dump(profiler.to_dict(), f, indent=2, sort_keys=True)
+
+def plot(argv):
+    """plot reads coordinate records from stdin and plots them, refreshing the terminal at a fixed rate"""
+    from drawille.plot import POINTS, MINMAX
+    from drawille.screen import Region
+    from drawille.stream import StreamPlot, records, formats, TEXT
+
+    p = argparse.ArgumentParser(prog='drawille plot', description='plot coordinate records read from stdin')
+    add = p.add_argument
+    add("--format", "-f",  help='record format (default: text)', choices=formats, default=TEXT)
+    add("--series", "-s",  help='records are y values, plotted over the record index', action='store_true')
+    add("--window", "-w",  help='only plot the last N records', type=int, metavar='N')
+    add("--mode",          help='plot points or min/max per column (default: points)', choices=(POINTS, MINMAX), default=POINTS)
+    add("--fps",           help='terminal refreshes per second (default: 10)', type=float, default=10)
+    add("--x-scale",       help='x pixels per unit (default: 1)', type=float, default=1)
+    add("--y-scale",       help='y pixels per unit, negative values draw upwards (default: 1)', type=float, default=1)
+    add("--x-offset",      help='x pixel offset (default: 0)', type=float, default=0)
+    add("--y-offset",      help='y pixel offset (default: 0)', type=float, default=0)
+    add("--chunk-size",    help='bytes read at once (default: 1 MiB)', type=int, default=1 << 20)
+    args = p.parse_args(argv)
+
+    stream = StreamPlot(args.window, args.series, args.mode, x_scale=args.x_scale, y_scale=args.y_scale,
+                        x_offset=args.x_offset, y_offset=args.y_offset)
+    stdin = getattr(sys.stdin, 'buffer', sys.stdin)
+    screen = Region(reserve=1) if sys.stdout.isatty() else None
+    delay = 1.0 / args.fps if args.fps > 0 else 0.0
+    refresh = clock() + delay
+    try:
+        for values in records(stdin, args.format, 1 if args.series else 2, args.chunk_size):
+            stream.add(values)
+            if screen is not None and clock() >= refresh:
+                screen.draw(stream.draw())
+                refresh = clock() + delay
+    except KeyboardInterrupt: pass
+    finally:
+        if screen is None: print(stream.draw().frame())
+        else:              screen.draw(stream.draw()); screen.end()
 
 def main():
+    if sys.argv[1:2] == ['plot']: return plot(sys.argv[2:])  # the plot mode does not need the REPL stack
+
+    from drawille.repl import Turtille, StopTurtille  # the REPL stack is only loaded when running the CLI
+
     p = argparse.ArgumentParser(); add = p.add_argument
-    add("--debug",       help='enable debug logs', action='store_true')
-    add("--print", "-p", help='print the turtle frame on exit', action='store_true', dest='_print')
-    add("--run",   "-c", help='turtille program code', nargs='+', default=None, metavar='PROGRAM')
-    add("turfile",       help='turtille code file',    nargs='?',               metavar='TURFILE')
+    add("--debug",        help='enable debug logs', action='store_true')
+    add("--print", "-p",  help='print the turtle frame on exit', action='store_true', dest='_print')
+    add("--run",   "-c",  help='turtille program code', nargs='+', default=None, metavar='PROGRAM')
+    add("--profile",      help='print the program profile', action='store_true')
+    add("--profile-json", help='save the program profile as JSON', metavar='FILE')
+    add("--no-cache",     help='do not read or write __turcache__ files', action='store_false', dest='cache')
+    add("turfile",        help='turtille code file',    nargs='?',               metavar='TURFILE')
     args = p.parse_args()
 
     level = logging.DEBUG if args.debug else logging.INFO
     logging.basicConfig(level=level)
 
-    tur = Turtille()
+    tur = Turtille(use_cache=args.cache)
     try:
         if args.run is not None:
-            tur.run(' '.join(args.run))
+            run(tur, tur.parse(' '.join(args.run)), args.profile, args.profile_json)
         elif args.turfile:
-            program = tur.load(args.turfile)
-            tur.run_program(program)
+            run(tur, tur.load(args.turfile), args.profile, args.profile_json)
         else:
             tur.start()
     except StopTurtille: pass
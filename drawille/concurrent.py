@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU AGPL (see LICENSE file or http://www.gnu.org/licenses)
+
+"""
+A :class:`drawille.canvas.Canvas` shared by several threads.
+
+Setting a pixel reads and writes the whole braille cell, so two threads
+setting pixels of the same cell can lose one of the pixels, and rendering
+iterates over the rows while other threads may add or remove rows.
+
+A :class:`ConcurrentCanvas` guards its rows with a fixed number of locks,
+each lock guarding every `stripes`-th row, so threads drawing on different
+rows rarely wait for each other. Frames are rendered from a snapshot of the
+cells, copied while holding all locks, so a frame never shows half of a
+batch of pixels set by :meth:`set_pixels` on one row:
+
+    from threading import Thread
+    from drawille import ConcurrentCanvas
+
+    c = ConcurrentCanvas()
+    producers = [Thread(target=lambda i=i: [c.set(x, i * 4) for x in range(100)]) for i in range(4)]
+    for p in producers: p.start()
+    print(c.frame())  # safe while the producers are drawing
+"""
+
+from __future__ import absolute_import
+from builtins import super
+
+import os
+from contextlib import contextmanager
+from threading import RLock
+from drawille.canvas import Canvas, IntDict, iround
+
+
+class ConcurrentCanvas(Canvas):
+    """ConcurrentCanvas is a thread-safe :class:`Canvas` with striped row locks."""
+
+    def __init__(self, line_ending=os.linesep, stripes=16):
+        """
+        :param line_ending: (optional) line ending of the frames
+        :param stripes: number of row locks
+        """
+        self.locks = [RLock() for _ in range(stripes)]
+        super().__init__(line_ending)
+
+
+    def lock(self, row):
+        """Return the lock of the row."""
+        return self.locks[row % len(self.locks)]
+
+
+    @contextmanager
+    def locked(self, rows=None):
+        """Hold the locks of the rows, or all locks, always acquired in the same order."""
+        n = len(self.locks)
+        stripes = range(n) if rows is None else sorted(set(row % n for row in rows))
+        for i in stripes: self.locks[i].acquire()
+        try:     yield
+        finally:
+            for i in stripes: self.locks[i].release()
+
+
+    def clear(self):
+        with self.locked(): super().clear()
+
+
+    def set(self, x, y):
+        with self.lock(iround(y) // 4): super().set(x, y)
+
+
+    def unset(self, x, y):
+        with self.lock(iround(y) // 4): super().unset(x, y)
+
+
+    def toggle(self, x, y):
+        with self.lock(iround(y) // 4): super().toggle(x, y)
+
+
+    def set_text(self, x, y, text):
+        with self.lock(iround(y) // 4): super().set_text(x, y, text)
+
+
+    def get(self, x, y):
+        with self.lock(iround(y) // 4): return super().get(x, y)
+
+
+    def set_pixels(self, points):
+        """Set many pixels, holding the lock of each group of rows only once."""
+        n, bands = len(self.locks), {}
+        for p in points: bands.setdefault((p[1] >> 2) % n, []).append(p)
+        for i, band in bands.items():
+            with self.locks[i]: super().set_pixels(band)
+
+
+    def stamp(self, template, x, y):
+        row = y >> 2
+        with self.locked(row + drow for drow, _ in template.masks(x & 1, y & 3)):
+            super().stamp(template, x, y)
+
+
+    def snapshot(self):
+        """Return a :class:`Canvas` with a copy of the cells, taken while no thread is drawing."""
+        copy = Canvas(self.line_ending)
+        with self.locked():
+            for row, cols in self.chars.items():
+                cells = copy.chars[row] = IntDict()
+                cells.update(cols)
+        return copy
+
+
+    def rows(self, min_x=None, min_y=None, max_x=None, max_y=None):
+        return self.snapshot().rows(min_x, min_y, max_x, max_y)
+
+
+    def raster(self, min_x=None, min_y=None, max_x=None, max_y=None, invert=False):
+        return self.snapshot().raster(min_x, min_y, max_x, max_y, invert)
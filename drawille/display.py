@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU AGPL (see LICENSE file or http://www.gnu.org/licenses)
+
+"""
+Display lists of line segments, rasterized lazily at any scale and viewport.
+
+A :class:`drawille.turtle.Turtle` with a :class:`DisplayList` stores the
+segments it draws instead of setting pixels. Each frame only rasterizes the
+segments in the requested viewport, at the requested scale, so panning and
+zooming over a large drawing does not require re-running the program:
+
+    from drawille import Turtle
+    from drawille.display import DisplayList
+
+    t = Turtle(display_list=DisplayList())
+    for _ in range(36): t.forward(10); t.right(170)
+    print(t.frame(scale=2))
+    print(t.frame(0, 0, 40, 40, scale=4))
+
+Segments are stored in a flat `array('d')`. Consecutive segments are grouped
+into blocks of `block_size` segments, and the bounding box of each block is
+kept in a second array, so that blocks outside the viewport are skipped
+without looking at their segments. Consecutive blocks are grouped again into
+groups of `group_size` blocks with their own bounding boxes, so that a query
+only tests the boxes of all groups and the block boxes of the groups in the
+viewport. Since the segments of a drawing are usually connected, the boxes of
+consecutive segments are small.
+"""
+
+from __future__ import absolute_import
+from builtins import super
+
+from array import array
+from drawille.canvas import line_pixels
+
+inf = float('inf')
+
+
+class DisplayList(object):
+    """DisplayList stores line segments with a two-level bounding box index of blocks of segments."""
+
+    def __init__(self, block_size=64, group_size=64):
+        super().__init__()
+        self.block_size = block_size
+        self.group_size = group_size  # number of blocks per group
+        self.clear()
+
+
+    def clear(self):
+        """Remove all segments."""
+        self.coords = array('d')  # x1, y1, x2, y2 of each segment
+        self.boxes = array('d')   # min x, min y, max x, max y of each block of segments
+        self.groups = array('d')  # min x, min y, max x, max y of each group of blocks
+
+
+    def __len__(self):
+        return len(self.coords) // 4
+
+
+    def add(self, x1, y1, x2, y2):
+        """Add the line segment from (x1, y1) to (x2, y2)."""
+        lo_x, hi_x = (x1, x2) if x1 <= x2 else (x2, x1)
+        lo_y, hi_y = (y1, y2) if y1 <= y2 else (y2, y1)
+        n = len(self)
+
+        for boxes, size in ((self.boxes, self.block_size), (self.groups, self.block_size * self.group_size)):
+            if n % size == 0:
+                boxes.extend((lo_x, lo_y, hi_x, hi_y))
+                continue
+            b = len(boxes) - 4
+            if lo_x < boxes[b]:     boxes[b]     = lo_x
+            if lo_y < boxes[b + 1]: boxes[b + 1] = lo_y
+            if hi_x > boxes[b + 2]: boxes[b + 2] = hi_x
+            if hi_y > boxes[b + 3]: boxes[b + 3] = hi_y
+        self.coords.extend((x1, y1, x2, y2))
+
+
+    def bounds(self):
+        """Return the (min_x, min_y, max_x, max_y) bounding box of all segments or None if empty."""
+        boxes = self.groups
+        if len(boxes) == 0: return None
+        return min(boxes[0::4]), min(boxes[1::4]), max(boxes[2::4]), max(boxes[3::4])
+
+
+    def segments(self, min_x=None, min_y=None, max_x=None, max_y=None):
+        """Yields the (x1, y1, x2, y2) segments with bounding boxes intersecting the given bounds."""
+        min_x = -inf if min_x is None else min_x
+        min_y = -inf if min_y is None else min_y
+        max_x =  inf if max_x is None else max_x
+        max_y =  inf if max_y is None else max_y
+        coords, boxes, groups = self.coords, self.boxes, self.groups
+        n, m = self.block_size * 4, self.group_size * 4
+
+        for g in range(0, len(groups), 4):
+            if groups[g] > max_x or groups[g + 1] > max_y or groups[g + 2] < min_x or groups[g + 3] < min_y:
+                continue
+            for b in range(g * self.group_size, min(g * self.group_size + m, len(boxes)), 4):
+                if boxes[b] > max_x or boxes[b + 1] > max_y or boxes[b + 2] < min_x or boxes[b + 3] < min_y:
+                    continue
+                start = b * self.block_size
+                for i in range(start, min(start + n, len(coords)), 4):
+                    x1, y1, x2, y2 = coords[i:i + 4]
+                    if x1 < min_x and x2 < min_x or x1 > max_x and x2 > max_x: continue
+                    if y1 < min_y and y2 < min_y or y1 > max_y and y2 > max_y: continue
+                    yield x1, y1, x2, y2
+
+
+    def rasterize(self, canvas, scale=1, min_x=None, min_y=None, max_x=None, max_y=None):
+        """Set the pixels of the segments at the given scale on the canvas,
+        only drawing the pixels within the given pixel bounds.
+
+        :param canvas: :class:`drawille.canvas.Canvas` object
+        :param scale: scale of the segment coordinates
+        :param min_x: (optional) minimum x pixel coordinate
+        :param min_y: (optional) minimum y pixel coordinate
+        :param max_x: (optional) maximum x pixel coordinate (exclusive)
+        :param max_y: (optional) maximum y pixel coordinate (exclusive)
+        """
+        # pixels are rounded, so segments up to half a pixel outside of the bounds may be visible
+        margin = 0.5 / scale
+        query = [None if v is None else v / float(scale) + d
+                 for v, d in ((min_x, -margin), (min_y, -margin), (max_x, margin), (max_y, margin))]
+        bounded = any(v is not None for v in (min_x, min_y, max_x, max_y))
+        lo_x = -inf if min_x is None else min_x
+        lo_y = -inf if min_y is None else min_y
+        hi_x =  inf if max_x is None else max_x
+        hi_y =  inf if max_y is None else max_y
+
+        pixels = []
+        for x1, y1, x2, y2 in self.segments(*query):
+            points = line_pixels(x1 * scale, y1 * scale, x2 * scale, y2 * scale)
+            if bounded: pixels.extend(p for p in points if lo_x <= p[0] < hi_x and lo_y <= p[1] < hi_y)
+            else:       pixels.extend(points)
+        canvas.set_pixels(pixels)
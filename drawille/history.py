@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU AGPL (see LICENSE file or http://www.gnu.org/licenses)
+
+"""
+Undo and redo of the changes of a :class:`drawille.canvas.Canvas`.
+
+A :class:`History` records the changes of a canvas in steps. While a step is
+recorded, the drawing methods of the canvas instance are wrapped, and the
+previous value of each cell is stored the first time the cell is changed.
+A step therefore only stores the cells it changed, plus the pose of a
+:class:`drawille.turtle.Turtle`, instead of a copy of the whole canvas:
+
+    from drawille import Turtle
+    from drawille.history import History
+
+    t = Turtle()
+    history = History(t)
+    with history.record(): t.forward(10)
+    history.undo()  # the line is removed and the turtle is back at (0, 0)
+    history.redo()
+
+`clear` replaces the cells of a canvas with an empty dict. A step keeps the
+replaced dict instead of copying its cells, and undoing the step restores it.
+The segments of a :class:`drawille.display.DisplayList` and the pixels unset
+in them are not recorded.
+"""
+
+from __future__ import absolute_import
+from builtins import super
+
+from contextlib import contextmanager
+from drawille.canvas import colrow
+
+# attributes of a turtle restored by undo and redo
+pose_attrs = ('pos_x', 'pos_y', 'rotation', 'brush_on')
+
+# methods of a canvas changing cells
+cell_ops = ('set', 'unset', 'toggle', 'set_text', 'set_pixels', 'stamp', 'clear')
+
+
+def pose(canvas):
+    return tuple(getattr(canvas, name, None) for name in pose_attrs)
+
+def set_pose(canvas, values):
+    for name, value in zip(pose_attrs, values):
+        if value is not None: setattr(canvas, name, value)
+
+
+class Step(object):
+    """Step stores the previous values of the cells changed by one recorded step.
+    Cells are stored per dict of cells, since `clear` replaces the cells of the canvas."""
+
+    def __init__(self, canvas):
+        super().__init__()
+        self.chars = canvas.chars  # cells before the step
+        self.pose = pose(canvas)   # pose before the step
+        self.cells = [(canvas.chars, {})]  # dict of cells -> {(row, col): previous value or None}
+
+    def end(self, canvas):
+        self.end_chars = canvas.chars
+        self.end_pose = pose(canvas)
+
+    def changed(self):
+        return len(self.cells) > 1 or len(self.cells[0][1]) > 0 or self.pose != self.end_pose
+
+    def swap(self):
+        """Swap the current and stored values of all cells, so that the same step can be
+        used for undoing and then for redoing it."""
+        for chars, cells in self.cells:
+            for (row, col), value in cells.items():
+                current = chars.get(row, {}).get(col)
+                cells[row, col] = current
+                if value is not None:   chars[row][col] = value
+                elif current is None:   continue
+                else:
+                    del chars[row][col]
+                    if not chars[row]: del chars[row]
+
+
+class History(object):
+    """History records the changes of a canvas as steps that can be undone and redone."""
+
+    def __init__(self, canvas, max_steps=100):
+        super().__init__()
+        self.canvas = canvas
+        self.max_steps = max_steps  # maximum number of steps that can be undone
+        self.undo_steps = []
+        self.redo_steps = []
+        self.step = None  # step being recorded
+
+
+    def begin(self):
+        """Start recording a step."""
+        canvas = self.canvas
+        if hasattr(canvas, 'flush'): canvas.flush()  # buffered turtle segments belong to the previous step
+        step = self.step = Step(canvas)
+
+        def saving(fn, cells):
+            # stores the previous value of the cells, before they are changed by `fn`
+            def save(*args):
+                chars, saved = step.cells[-1]
+                for cell in cells(*args):
+                    if cell not in saved:
+                        row, col = cell
+                        saved[cell] = chars.get(row, {}).get(col)
+                return fn(*args)
+            return save
+
+        def pixel(x, y):
+            col, row = colrow(x, y)
+            return ((row, col),)
+
+        def text(x, y, text):
+            col, row = colrow(x, y)
+            return ((row, col + i) for i in range(len(text)))
+
+        def stamp(template, x, y):
+            col, row = x >> 1, y >> 2
+            return ((row + drow, col + dcol) for drow, masks in template.masks(x & 1, y & 3) for dcol, _ in masks)
+
+        def clear():
+            clear.wrapped()
+            step.cells.append((canvas.chars, {}))
+
+        self.wrapped = dict((name, canvas.__dict__.get(name)) for name in cell_ops)
+        for name in ('set', 'unset', 'toggle'):
+            setattr(canvas, name, saving(getattr(canvas, name), pixel))
+        set_pixels = saving(canvas.set_pixels, lambda points: ((y >> 2, x >> 1) for x, y in points))
+        canvas.set_pixels = lambda points: set_pixels(list(points))
+        canvas.set_text = saving(canvas.set_text, text)
+        canvas.stamp = saving(canvas.stamp, stamp)
+        clear.wrapped = canvas.clear
+        canvas.clear = clear
+
+
+    def end(self):
+        """Stop recording and store the step, if it changed anything."""
+        canvas, step = self.canvas, self.step
+        if hasattr(canvas, 'flush'): canvas.flush()
+        for name, fn in self.wrapped.items():
+            if fn is None: canvas.__dict__.pop(name, None)
+            else:          setattr(canvas, name, fn)  # e.g., methods wrapped by :class:`drawille.stats.CanvasStats`
+        self.step = None
+        step.end(canvas)
+        if not step.changed(): return
+        self.undo_steps.append(step)
+        del self.undo_steps[:-self.max_steps]
+        self.redo_steps = []
+
+
+    @contextmanager
+    def record(self):
+        """Record the changes made in the `with` block as one step."""
+        self.begin()
+        try:     yield
+        finally: self.end()
+
+
+    def undo(self):
+        """Undo the last step. Returns False if there is nothing to undo."""
+        if not self.undo_steps: return False
+        step = self.undo_steps.pop()
+        if hasattr(self.canvas, 'flush'): self.canvas.flush()
+        step.swap()
+        self.canvas.chars = step.chars
+        set_pose(self.canvas, step.pose)
+        self.redo_steps.append(step)
+        return True
+
+
+    def redo(self):
+        """Redo the last undone step. Returns False if there is nothing to redo."""
+        if not self.redo_steps: return False
+        step = self.redo_steps.pop()
+        if hasattr(self.canvas, 'flush'): self.canvas.flush()
+        step.swap()
+        self.canvas.chars = step.end_chars
+        set_pose(self.canvas, step.end_pose)
+        self.undo_steps.append(step)
+        return True
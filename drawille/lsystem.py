@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU AGPL (see LICENSE file or http://www.gnu.org/licenses)
+
+"""
+Lindenmayer systems (L-systems) drawn by a :class:`drawille.turtle.Turtle`.
+
+The rewritten string of an L-system grows exponentially with the depth.
+:class:`LSystem` never builds it, but expands the rules depth-first while
+drawing, keeping only one position per rewrite level in memory:
+
+    from drawille import Turtle
+    from drawille.lsystem import LSystem
+
+    koch = LSystem('F', {'F': 'F+F-F-F+F'}, angle=90, step=2)
+    t = Turtle()
+    koch.draw(t, depth=4)
+    print(t.frame())
+
+Symbols:
+
+    F, G   move forward and draw
+    f      move forward without drawing
+    +      turn right by `angle`
+    -      turn left by `angle`
+    |      turn around
+    [      push the turtle position and rotation
+    ]      pop the turtle position and rotation
+
+All other symbols are only used for rewriting.
+"""
+
+from __future__ import absolute_import
+from builtins import super
+
+import math
+
+
+class LSystem(object):
+    """LSystem is an `axiom` with a set of rewrite `rules`, mapping single
+    symbols to their replacement strings."""
+
+    def __init__(self, axiom, rules, angle=90, step=2):
+        super().__init__()
+        self.axiom = axiom
+        self.rules = dict(rules)
+        self.angle = angle
+        self.step = step
+
+
+    @classmethod
+    def parse_rules(cls, rules):
+        """Convert rules given as 'X=replacement' strings to a dict."""
+        parsed = {}
+        for rule in rules:
+            symbol, sep, replacement = rule.partition('=')
+            if len(symbol) != 1 or sep != '=':
+                raise ValueError('invalid L-system rule: "{}"'.format(rule))
+            parsed[symbol] = replacement
+        return parsed
+
+
+    def expand(self, depth):
+        """Yields the symbols of the system after `depth` rewrites.
+        Memory usage is O(depth), the rewritten string is never stored.
+
+        :param depth: Integer. Number of rewrites.
+        """
+        rules = self.rules
+        stack = [(iter(self.axiom), depth)]
+
+        while stack:
+            symbols, level = stack[-1]
+            for symbol in symbols:
+                if level > 0 and symbol in rules:
+                    stack.append((iter(rules[symbol]), level - 1))
+                    break
+                yield symbol
+            else:
+                stack.pop()
+
+
+    def draw(self, turtle, depth):
+        """Draw the system after `depth` rewrites with the given turtle.
+
+        :param turtle: :class:`drawille.turtle.Turtle` object
+        :param depth: Integer. Number of rewrites.
+        """
+        angle, step = self.angle, self.step
+        saved = []
+
+        for symbol in self.expand(depth):
+            if   symbol in 'FG': turtle.forward(step)
+            elif symbol == '+':  turtle.right(angle)
+            elif symbol == '-':  turtle.left(angle)
+            elif symbol == '|':  turtle.right(180)
+            elif symbol == '[':  saved.append((turtle.pos_x, turtle.pos_y, turtle.rotation))
+            elif symbol == ']':
+                x, y, turtle.rotation = saved.pop()
+                jump(turtle, x, y)
+            elif symbol == 'f':
+                jump(turtle,
+                     turtle.pos_x + math.cos(math.radians(turtle.rotation)) * step,
+                     turtle.pos_y + math.sin(math.radians(turtle.rotation)) * step)
+
+
+    def format(self):
+        """Returns the axiom and rules as 'X=replacement' strings."""
+        return [self.axiom] + ['{}={}'.format(k, v) for k, v in sorted(self.rules.items())]
+
+
+def jump(turtle, x, y):
+    """Move the turtle to a coordinate without drawing."""
+    brush = turtle.brush_on
+    turtle.up()
+    turtle.move(x, y)
+    turtle.brush_on = brush
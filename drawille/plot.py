@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU AGPL (see LICENSE file or http://www.gnu.org/licenses)
+
+"""
+Plotting of large data series on a :class:`drawille.canvas.Canvas`.
+
+A braille cell shows at most 2x4 dots, so plotting millions of samples one
+`Canvas.set` call at a time mostly redraws the same pixels. A :class:`Plot`
+maps whole chunks of samples to pixel coordinates, reduces them to the
+distinct pixels (or to the per-column min/max) and only draws those.
+
+A :class:`DensityCanvas` keeps a hit count per pixel instead of a single bit
+and turns the counts into dots only when a frame is rendered.
+"""
+
+from __future__ import absolute_import
+from builtins import super
+
+import os
+from array import array
+from collections import Counter
+from itertools import repeat
+from operator import add, mul
+from drawille.canvas import Canvas, IS_PY2, IntDict2d, iround, colrow, pixel_map
+
+POINTS = 'points'
+MINMAX = 'minmax'
+
+# ordered dither thresholds (in eighths) for the 2x4 dots of a braille cell
+dither_map = ((0, 4),
+              (6, 2),
+              (1, 5),
+              (7, 3))
+
+def to_pixels(values, scale=1, offset=0):
+    """Map a sequence of data values to integer pixel coordinates,
+    rounding the same way as :meth:`Canvas.set`."""
+    if scale  != 1: values = map(mul, values, repeat(scale))
+    if offset != 0: values = map(add, values, repeat(offset))
+    if IS_PY2:      return map(int, map(round, values))
+    else:           return map(round, values)
+
+
+class Plot(object):
+    """Plot decimates large data series onto the braille pixel grid of a canvas.
+
+    Samples are mapped to pixels using `x * x_scale + x_offset` and
+    `y * y_scale + y_offset` and then reduced, depending on the `mode`:
+
+    * `points`: every distinct pixel is kept once. The result is the same as
+      calling :meth:`Canvas.set` for every sample.
+    * `minmax`: only the lowest and highest pixel of each pixel column are kept
+      and the column is filled between them, as a dense series would be drawn.
+
+    Samples can be added in any number of chunks, the memory used by the
+    plot is bounded by the number of pixels, not the number of samples.
+    """
+
+    def __init__(self, canvas=None, mode=POINTS, x_scale=1, y_scale=1, x_offset=0, y_offset=0):
+        if mode not in (POINTS, MINMAX):
+            raise ValueError("Unsupported plot mode <{0}>".format(mode))
+        super().__init__()
+        self.canvas = Canvas() if canvas is None else canvas
+        self.mode = mode
+        self.x_scale = x_scale
+        self.y_scale = y_scale
+        self.x_offset = x_offset
+        self.y_offset = y_offset
+        self.clear()
+
+
+    def clear(self):
+        """Remove all samples from the :class:`Plot` object."""
+        self.count = 0       # number of samples added so far
+        self.pixels = set()  # distinct pixels in `points` mode
+        self.columns = {}    # pixel column -> (min y, max y) in `minmax` mode
+
+
+    def add(self, xs, ys):
+        """Add a chunk of samples.
+
+        :param xs: sequence of x values
+        :param ys: sequence of y values, same length as `xs`
+        """
+        px = to_pixels(xs, self.x_scale, self.x_offset)
+        py = to_pixels(ys, self.y_scale, self.y_offset)
+        chunk = set(zip(px, py))
+        self.count += len(ys)
+
+        if self.mode == POINTS:
+            self.pixels.update(chunk)
+            return
+
+        columns = self.columns
+        for x, y in chunk:
+            lo_hi = columns.get(x)
+            if   lo_hi is None:  columns[x] = (y, y)
+            elif y < lo_hi[0]:   columns[x] = (y, lo_hi[1])
+            elif y > lo_hi[1]:   columns[x] = (lo_hi[0], y)
+
+
+    def add_series(self, ys):
+        """Add a chunk of y values, using the running sample index as x value.
+
+        :param ys: sequence of y values
+        """
+        self.add(range(self.count, self.count + len(ys)), ys)
+
+
+    def draw(self):
+        """Draw the plotted pixels on the canvas and return the canvas."""
+        if self.mode == POINTS:
+            self.canvas.set_pixels(self.pixels)
+        else:
+            for x, (lo, hi) in self.columns.items():
+                self.canvas.set_pixels((x, y) for y in range(lo, hi + 1))
+        return self.canvas
+
+
+    def frame(self, min_x=None, min_y=None, max_x=None, max_y=None):
+        """Draw the plot and return the canvas frame, see :meth:`Canvas.frame`."""
+        return self.draw().frame(min_x, min_y, max_x, max_y)
+
+
+class DensityCanvas(Canvas):
+    """DensityCanvas counts the hits of each pixel in a fixed `width` x `height`
+    pixel area, instead of storing a single bit per pixel.
+
+    The counts are turned into braille dots when a frame is rendered: a pixel
+    is shown if its count reaches the `threshold`, or, with `dither=True`,
+    using an ordered dither of the counts relative to the highest count.
+    Hits outside of the area are ignored.
+    """
+
+    def __init__(self, width, height, threshold=1, dither=False, line_ending=os.linesep):
+        self.width = width
+        self.height = height
+        self.threshold = threshold
+        self.dither = dither
+        super().__init__(line_ending=line_ending)
+
+
+    def clear(self):
+        """Remove all hits and text from the :class:`DensityCanvas` object."""
+        super().clear()
+        self.counts = array('d', [0.0]) * (self.width * self.height)  # doubles do not saturate at 2**24 hits
+        self.text = {}
+        self.max_count = None  # cached highest count, None: the counts changed
+
+
+    def index(self, x, y):
+        """Return the index of a pixel in `counts` or None if it is out of range."""
+        x = iround(x)
+        y = iround(y)
+        if 0 <= x < self.width and 0 <= y < self.height: return y * self.width + x
+        else:                                            return None
+
+
+    def hit(self, x, y, weight=1):
+        """Count a hit of a pixel.
+
+        :param x: x coordinate of the pixel
+        :param y: y coordinate of the pixel
+        :param weight: (optional) amount to add to the pixel count
+        """
+        i = self.index(x, y)
+        if i is not None: self.counts[i] += weight; self.max_count = None
+
+
+    def add(self, xs, ys):
+        """Count a hit for each of the given coordinates.
+
+        :param xs: sequence of x coordinates
+        :param ys: sequence of y coordinates, same length as `xs`
+        """
+        w, h, counts = self.width, self.height, self.counts
+        for (x, y), n in Counter(zip(to_pixels(xs), to_pixels(ys))).items():
+            if 0 <= x < w and 0 <= y < h: counts[y * w + x] += n
+        self.max_count = None
+
+
+    def decay(self, factor):
+        """Multiply all counts by `factor`, e.g., to fade out old hits between frames."""
+        self.counts = array('d', map(mul, self.counts, repeat(factor)))
+        self.max_count = None
+
+
+    def set(self, x, y):
+        """Count a hit of a pixel, see :meth:`hit`."""
+        self.hit(x, y)
+
+
+    def unset(self, x, y):
+        """Reset the count of a pixel."""
+        i = self.index(x, y)
+        if i is not None: self.counts[i] = 0; self.max_count = None
+
+
+    def set_pixels(self, points):
+        """Count a hit for each of the given integer (x, y) coordinates."""
+        w, h, counts = self.width, self.height, self.counts
+        for x, y in points:
+            if 0 <= x < w and 0 <= y < h: counts[y * w + x] += 1
+        self.max_count = None
+
+
+    def stamp(self, template, x, y):
+        """Count a hit for each pixel of a :class:`drawille.shapes.Template`."""
+        self.set_pixels(template.pixels(x, y))
+
+
+    def set_text(self, x, y, text):
+        """Set text to the given coords, see :meth:`Canvas.set_text`."""
+        col, row = colrow(x, y)
+        for i, c in enumerate(text):
+            self.text[row, col + i] = c
+
+
+    def toggle(self, x, y):
+        """Reset the count of a visible pixel or count a hit for an invisible one."""
+        if self.get(x, y): self.unset(x, y)
+        else:              self.hit(x, y)
+
+
+    def get(self, x, y):
+        """Get the rendered state of a pixel. Returns bool."""
+        if colrow(x, y)[::-1] in self.text: return True
+        i = self.index(x, y)
+        if i is None: return False
+        return self.visible(iround(x), iround(y), self.counts[i], self.dither_limit())
+
+
+    def dither_limit(self):
+        """Return the count that fills a whole cell when dithering or 0 if not dithering.
+        The highest count is cached until the counts change or the canvas is rendered."""
+        if not self.dither or len(self.counts) == 0: return 0
+        if self.max_count is None: self.max_count = max(self.counts)
+        return self.max_count
+
+
+    def visible(self, x, y, count, limit):
+        """Decide if a pixel with the given count is shown as a dot."""
+        if limit: return count * 8 >= (dither_map[y % 4][x % 2] + 0.5) * limit
+        else:     return count > 0 and count >= self.threshold
+
+
+    def render(self):
+        """Convert the pixel counts to braille cells."""
+        chars = self.chars = IntDict2d()
+        w, visible = self.width, self.visible
+        self.max_count = None  # the counts may have been changed directly
+        limit = self.dither_limit()
+
+        for i, n in enumerate(self.counts):
+            if not n: continue
+            y, x = divmod(i, w)
+            if visible(x, y, n, limit): chars[y // 4][x // 2] |= pixel_map[y % 4][x % 2]
+
+        for (row, col), c in self.text.items():
+            chars[row][col] = c
+
+
+    def rows(self, min_x=None, min_y=None, max_x=None, max_y=None):
+        """Yields the rendered lines, see :meth:`Canvas.rows`."""
+        self.render()
+        return super().rows(min_x, min_y, max_x, max_y)
+
+
+    def raster(self, min_x=None, min_y=None, max_x=None, max_y=None, invert=False):
+        """Returns the rendered pixel rows, see :meth:`Canvas.raster`."""
+        self.render()
+        return super().raster(min_x, min_y, max_x, max_y, invert)
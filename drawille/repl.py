@@ -15,11 +15,16 @@ See the class docu for more details.
 """
 
 from __future__ import unicode_literals, absolute_import, print_function
-from builtins import open, super
+from builtins import open, super, range
 
-import re, os, logging, time
+import re, os, sys, logging, time, ast, math, json, hashlib
+from functools import partial
+from itertools import count
 import lark
 from drawille.turtle import Turtle
+from drawille.history import History
+from drawille.screen import Region
+from drawille.lsystem import LSystem
 from prompt_toolkit import prompt
 from prompt_toolkit.history import InMemoryHistory
 try:
@@ -79,6 +84,13 @@ You can also draw animations:
     flower10 -> flower r 10  # draw something + change angle slightly
     animate 5 flower10       # repeat program 5 times
     animate flower10         # repeat program forever (press Ctrl-C to stop)
+    animate fps 60 flower10  # draw 60 frames per second (default: 24)
+
+You can also declare L-systems (name, axiom, rules, angle, step) and draw
+them using their name and the number of rewrites:
+
+    lsystem koch "F" "F=F+F-F-F+F" 90 2
+    koch 4
 
 Other commands are:
 
@@ -86,6 +98,9 @@ Other commands are:
     reset  # reset Turtille (angle and position)
     clear  # clear the screen (but do not reset angle and position)
     print  # print the turtle frame to the screen
+    undo   # undo the last command (changed pixels and turtle position)
+    redo   # redo the last undone command
+    profile flower  # show calls, time, and drawn pixels of all commands
     quit   # exit Turtille
 
 """
@@ -113,6 +128,202 @@ class TurtilleLexer(RegexLexer):
     ])
 
 
+# instructions of compiled programs
+EXEC      = 'exec'       # compile and run a command:           (EXEC, cmd, args)
+CALL      = 'call'       # run a function:                      (CALL, name)
+LOOP      = 'loop'       # repeat compiled ops:                 (LOOP, num, ops)
+MEMO_CALL = 'memo_call'  # run a memoized drawing function:     (MEMO_CALL, name)
+MEMO_LOOP = 'memo_loop'  # repeat drawing ops until they cycle: (MEMO_LOOP, num, ops)
+
+
+class Execution(object):
+    """Execution runs a compiled program on an explicit call stack, so that
+    deeply nested and recursive programs do not grow the Python stack.
+    It can pause after a given budget of instructions and resume later.
+    Usage Example:
+
+        execution = tur.execute(tur.parse('100 * f2r10'))
+        while not execution.run(budget=1000):
+            tur.print_frame()  # show progress
+
+    """
+    def __init__(ex, tur, ops, max_depth=None):
+        ex.tur = tur
+        ex.max_depth = max_depth
+        ex.steps = 0                       # number of instructions run so far
+        ex.stack = [[iter(ops), 1, ops, None]]  # frames: [ops iterator, remaining iterations, ops, memo]
+
+    @property
+    def done(ex): return len(ex.stack) == 0
+
+    @property
+    def depth(ex): return len(ex.stack)
+
+    def run(ex, budget=None):
+        """run runs the program until it is done or `budget` instructions were run.
+        Returns True if the program is done and False if it was paused."""
+        stack, steps = ex.stack, 0
+        limit = -1 if budget is None else budget
+        try:
+            while stack and steps != limit:
+                frame = stack[-1]
+                for op in frame[0]:
+                    steps += 1
+                    if type(op) is tuple: ex.push(frame, op); break
+                    op()
+                    if steps == limit: break
+                else:
+                    frame[1] -= 1
+                    if frame[3] is not None: frame[3].repeated(frame)
+                    if frame[1] > 0: frame[0] = iter(frame[2])
+                    else:            ex.pop()
+
+            # drop finished frames, so that a paused program at its end is reported as done
+            while stack and stack[-1][1] == 1 and stack[-1][0].__length_hint__() == 0: ex.pop()
+        except BaseException:
+            ex.abort()
+            raise
+        finally:
+            ex.steps += steps
+        return not stack
+
+    def pop(ex):
+        """pop removes the finished top frame, memoizing its effect if it is memoized"""
+        memo = ex.stack.pop()[3]
+        if memo is not None: memo.leave()
+
+    def abort(ex):
+        """abort removes all frames without memoizing the effects of unfinished memoized frames"""
+        while ex.stack:
+            memo = ex.stack.pop()[3]
+            if memo is not None: memo.leave(done=False)
+
+    def push(ex, frame, op):
+        """push runs an instruction by pushing its ops on the call stack"""
+        tur, kind, memo = ex.tur, op[0], None
+        if   kind in (LOOP, MEMO_LOOP): num, ops = op[1], op[2]
+        elif kind in (CALL, MEMO_CALL): num, ops = 1, tur.compile_func(op[1])
+        else:                           num, ops = 1, tur.compile_command(op[1], op[2], memoize=tur.memoize)
+
+        if kind == CALL and tur.tracing: log.debug('running: %s()', op[1])
+        if num <= 0 or len(ops) == 0: return
+
+        if frame[1] == 1 and frame[0].__length_hint__() == 0 and frame[3] is None:
+            ex.stack.pop()  # tail call: the current frame is finished and is not memoized
+        elif ex.max_depth is not None and len(ex.stack) >= ex.max_depth:
+            raise TurtilleError('program exceeded the maximum call depth of {}'.format(ex.max_depth))
+
+        if kind == MEMO_CALL:
+            memo = tur.memo_call(op[1])
+            if memo is None: return  # the memoized effect was applied
+        elif kind == MEMO_LOOP:
+            memo = MemoLoop(tur, num)
+        ex.stack.append([iter(ops), num, ops, memo])
+
+
+class MemoCall(object):
+    """MemoCall records the drawn pixels and the change of the turtle pose while the frame
+    of a memoized function runs, and memoizes them when the frame is finished, see `BaseVM.memo_call`"""
+    def __init__(memo, tur, key):
+        t = tur.turtle
+        memo.tur, memo.key = tur, key
+        memo.base = int(math.floor(t.pos_x)), int(math.floor(t.pos_y))
+        memo.start = t.pos_x, t.pos_y, t.rotation
+        memo.prev = t.record()
+
+    def repeated(memo, frame): pass
+
+    def leave(memo, done=True):
+        tur, t = memo.tur, memo.tur.turtle
+        pixels = t.stop_recording(memo.prev)
+        if not done: return
+        (bx, by), (x, y, rotation) = memo.base, memo.start
+        if len(tur.memo) >= tur.max_memo: tur.memo.clear()
+        tur.memo[memo.key] = (frozenset((px - bx, py - by) for px, py in pixels),
+                              t.pos_x - x, t.pos_y - y, t.rotation - rotation, t.brush_on)
+
+
+class MemoLoop(object):
+    """MemoLoop stops a loop of drawing commands early, once the turtle is back at the pose
+    it had before the first iteration. The drawn pixels only depend on the pose, and drawing
+    never removes pixels other than by clearing all of them, so all further cycles draw the
+    same pixels again. The remaining full cycles are skipped without comparing the canvas."""
+    def __init__(memo, tur, num):
+        memo.tur, memo.num = tur, num
+        memo.start = tur.pose()
+
+    def repeated(memo, frame):
+        """repeated is called after each iteration, with the remaining iterations in `frame[1]`"""
+        if memo.start is None or memo.tur.pose() != memo.start: return
+        frame[1] %= memo.num - frame[1]  # the cycle is the number of iterations run so far
+        memo.start = None
+
+    def leave(memo, done=True): pass
+
+
+clock = getattr(time, 'perf_counter', time.time)
+
+
+class Profiler(object):
+    """Profiler collects the number of calls, the cumulative and self time, and the
+    number of drawn pixels of each command and user function run by the VM.
+    It is only used by programs compiled for profiling, see `BaseVM.run_profiled`.
+    Usage Example:
+
+        profiler = tur.run_profiled(tur.parse('flower'))
+        tur.print_text(profiler.format())
+
+    """
+    def __init__(prof, turtle):
+        prof.turtle = turtle
+        prof.stats = {}         # name -> [calls, cumulative time, self time, pixels]
+        prof.functions = set()  # names of profiled user functions
+        prof.stack = []         # running functions: [name, start time, time of callees, start pixels]
+
+    def pixels(prof):
+        recording = prof.turtle.recording
+        return 0 if recording is None else len(recording)
+
+    def enter(prof, name):
+        prof.functions.add(name)
+        prof.stack.append([name, clock(), 0.0, prof.pixels()])
+
+    def leave(prof):
+        name, start, callees, pixels = prof.stack.pop()
+        prof.add(name, clock() - start, callees, prof.pixels() - pixels)
+
+    def leaf(prof, cmd, fn, args):
+        """leaf runs and profiles a builtin command"""
+        pixels, start = prof.pixels(), clock()
+        try:     fn(*args)
+        finally: prof.add(cmd, clock() - start, 0.0, prof.pixels() - pixels)
+
+    def add(prof, name, elapsed, callees, pixels):
+        stats = prof.stats.get(name)
+        if stats is None: stats = prof.stats[name] = [0, 0.0, 0.0, 0]
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] += elapsed - callees
+        stats[3] += pixels
+        if prof.stack: prof.stack[-1][2] += elapsed
+
+    def to_dict(prof):
+        """to_dict returns the stats of the functions and commands for exporting them as JSON"""
+        result = dict(functions={}, commands={})
+        for name, (calls, cumulative, own, pixels) in prof.stats.items():
+            kind = 'functions' if name in prof.functions else 'commands'
+            result[kind][name] = dict(calls=calls, cumulative=cumulative, self=own, pixels=pixels)
+        return result
+
+    def format(prof):
+        """format returns the stats as text table, sorted by cumulative time"""
+        lines = ['# {:>8} {:>12} {:>12} {:>10}  {}'.format('calls', 'cumtime ms', 'selftime ms', 'pixels', 'name')]
+        for name, (calls, cumulative, own, pixels) in sorted(prof.stats.items(), key=lambda kv: -kv[1][1]):
+            if name in prof.functions: name += ' ->'
+            lines.append('  {:>8} {:>12.3f} {:>12.3f} {:>10}  {}'.format(calls, cumulative * 1000, own * 1000, pixels, name))
+        return '\n'.join(lines)
+
+
 class ConsolePrinter(object):
     """ConsolePrinter is a Mixin Class for the Turtle VM for printng output to the console.
     All output is handled in this class, the BaseVM class is output agnostic.
@@ -146,6 +357,15 @@ class BaseVM(ConsolePrinter):
     def __init__(tur):
         tur.turtle = Turtle()
         tur.funcs = {}
+        tur.compiled = {}
+        tur.max_depth = 10000  # maximum depth of the call stack
+        tur.max_inline = 32    # maximum depth of inlined function calls
+        tur.max_inline_ops = 2048  # maximum number of ops of an inlined function, larger ones are called
+        tur.max_steps = None   # maximum number of instructions per program, None: unlimited
+        tur.memoize = False    # reuse the drawing of functions and stop repeating loops early
+        tur.memo = {}          # memoized function effects, see `memo_call`
+        tur.max_memo = 10000   # maximum number of memoized function effects
+        tur.profiler = None    # collects command stats while running `run_profiled`
         tur.reserved_commands = set()
         tur.commands = {}
         for k,v in [('left',    tur.turtle.left),
@@ -154,13 +374,14 @@ class BaseVM(ConsolePrinter):
                     ('down',    tur.turtle.down),
                     ('forward', tur.turtle.forward),
                     ('back',    tur.turtle.back),
-                    ('clear',   tur.turtle.clear),
+                    ('clear',   tur.clear),
                     ('move',    tur.turtle.move),
                     ('quit',    tur.quit),
                     ('inspect', tur.print_func),
                     ('help',    tur.help),
                     ('print',   tur.print_frame),
                     ('repeat',  tur.repeat),
+                    ('profile', tur.profile),
                     ('reset',   tur.reset),
                     ('comment', tur.comment)]:
             tur.add_command(k,v)
@@ -169,6 +390,7 @@ class BaseVM(ConsolePrinter):
     def add_command(tur, cmd, fn):
         log.debug("adding command: %s", cmd)
         assert cmd not in tur.commands, "safe overriding commands not supported"
+        tur.invalidate()
         tur.commands[cmd] = fn
         short = cmd[0]
         if short not in tur.commands:
@@ -184,9 +406,19 @@ class BaseVM(ConsolePrinter):
         else:
             program = tur.create_program(commands, safe=False)
             def run_function(): tur.run_program(program)
+            tur.invalidate()
             tur.commands[cmd] = run_function
             tur.funcs[cmd] = program
 
+    def define(tur, kind, *args):
+        """define adds a definition of the given kind, e.g., `define('func', name, cmds)`"""
+        getattr(tur, 'add_' + kind)(*args)
+
+    def invalidate(tur):
+        """invalidate drops all compiled and memoized functions after (re)defining commands"""
+        tur.compiled.clear()
+        tur.memo.clear()
+
     def create_program(tur, commands, safe=True):
         """create_program creates a program from a list of commands and checks
         if all commands are defined and completing the command arguments.
@@ -196,7 +428,7 @@ class BaseVM(ConsolePrinter):
         program = []
         errors  = []
         for tup in commands:
-            if   len(tup) == 1: cmd, args = tup, ()
+            if   len(tup) == 1: cmd, args = tup[0], ()
             elif len(tup) == 2: cmd, args = tup[0], tup[1]
             else:               errors.append('invalid command tuple: {}'.format(tup))
 
@@ -212,10 +444,154 @@ class BaseVM(ConsolePrinter):
         return program
 
     def run_program(tur, program):
-        """run_program directly runs a valid program"""
+        """run_program directly runs a valid program, see `execute`"""
+        execution = tur.execute(program)
+        if not execution.run(tur.max_steps):
+            execution.abort()
+            raise TurtilleError('program exceeded the instruction budget of {} steps'.format(tur.max_steps))
+
+    def execute(tur, program):
+        """execute returns a paused `Execution` of the program, that runs the program on an
+        explicit call stack when calling its `run` method. Each command of the program is
+        compiled right before it is run."""
+        return Execution(tur, tuple((EXEC, cmd, args) for cmd, args in program), tur.max_depth)
+
+    @property
+    def tracing(tur):
+        """tracing is enabled by debug logging, compiled programs then log each command"""
+        return log.isEnabledFor(logging.DEBUG)
+
+    def compile_program(tur, program, inlining=()):
+        """compile_program returns a flat tuple of ops running the program, see `compile_command`"""
+        ops = []
+        for cmd, args in program: ops.extend(tur.compile_command(cmd, args, inlining))
+        return tuple(ops)
+
+    def compile_command(tur, cmd, args, inlining=(), memoize=False):
+        """compile_command returns a tuple of ops running the command. Ops are either
+        argument-free callables or `(LOOP, num, ops)` and `(CALL, name)` instructions
+        for the `Execution`. Functions are inlined unless tracing or profiling, `repeat`
+        loops are compiled to a LOOP, and all other commands are bound to their arguments.
+        Compiled functions are cached until any command or function is (re)defined.
+        Using `memoize=True`, drawing functions and loops are compiled to `MEMO_CALL`
+        and `MEMO_LOOP` instructions, see `memo_call` and `MemoLoop`. This is only used
+        for top-level commands, since memoizing the many small calls inside of functions
+        and loops costs more than it saves."""
+        fn = tur.commands.get(cmd)
+        if fn is None:
+            # undefined commands fail when they are run, not when they are compiled
+            return (lambda: tur.commands[cmd](*args),)
+        elif cmd in tur.funcs and len(args) == 0:
+            if   tur.tracing or tur.profiler:         return ((CALL, cmd),)
+            elif memoize and tur.is_drawing(cmd):     return ((MEMO_CALL, cmd),)
+            ops = tur.compile_func(cmd, inlining)
+            # large functions are called, so that fan-out programs do not compile to huge tuples
+            if len(ops) > tur.max_inline_ops: return ((CALL, cmd),)
+            return ops
+        elif fn == tur.repeat:
+            num, cmds = args
+            try:               program = tur.create_program(cmds)
+            except ValueError: return (partial(fn, *args),)  # report errors when run
+            body = tur.compile_program(program, inlining)
+            if memoize and not (tur.tracing or tur.profiler) and tur.is_drawing(program=program, loop=True):
+                return ((MEMO_LOOP, num, body),)
+            return ((LOOP, num, body),)
+        elif tur.profiler:  return (partial(tur.profiler.leaf, cmd, fn, args),)
+        elif tur.tracing:   return (partial(tur.trace, cmd, fn, args),)
+        elif len(args) > 0: return (partial(fn, *args),)
+        else:               return (fn,)
+
+    def compile_func(tur, name, inlining=()):
+        """compile_func returns the cached compiled program of a function.
+        Recursive, deeply nested, and large functions (more than `max_inline_ops` ops)
+        are not inlined but compiled to CALL instructions.
+        When profiling, the program is wrapped in ops entering and leaving the function."""
+        key = (name, tur.tracing, tur.profiler)
+        if key in tur.compiled: return tur.compiled[key]
+        if name in inlining or len(inlining) >= tur.max_inline: return ((CALL, name),)
+        ops = tur.compile_program(tur.funcs[name], inlining + (name,))
+        if tur.profiler: ops = (partial(tur.profiler.enter, name),) + ops + (tur.profiler.leave,)
+        tur.compiled[key] = ops
+        return ops
+
+    def is_drawing(tur, name=None, program=None, loop=False, depth=0):
+        """is_drawing checks if a function (or program) only moves, turns, and draws
+        with the turtle, so that its effect only depends on the turtle pose.
+        Loops may also move the turtle to absolute positions and clear the canvas."""
+        t = tur.turtle
+        allowed = [t.forward, t.back, t.left, t.right, t.up, t.down, tur.comment]
+        if loop: allowed += [t.move, tur.clear, tur.reset]
+        if program is None: program = tur.funcs[name]
+        if depth > tur.max_inline: return False
         for cmd, args in program:
-            log.debug('running: %s%s', cmd, tuple(args))
-            tur.commands[cmd](*args)
+            fn = tur.commands.get(cmd)
+            if   fn is None:                          return False
+            elif cmd in tur.funcs and len(args) == 0: ok = cmd != name and tur.is_drawing(cmd, loop=loop, depth=depth + 1)
+            elif fn == tur.repeat:                    ok = tur.is_drawing(program=tur.create_program(args[1], safe=False), loop=loop, depth=depth + 1)
+            else:                                     ok = fn in allowed
+            if not ok: return False
+        return True
+
+    def pose(tur, relative=False):
+        """pose returns the turtle pose for comparing and memoizing drawings.
+        Positions and angles are rounded to 6 digits to ignore float errors.
+        Relative poses only contain the position within the pixel and its parity,
+        which is all that defines the drawn pixels relative to the start pixel."""
+        t = tur.turtle
+        pose = []
+        for v in (t.pos_x, t.pos_y):
+            if relative:
+                base = math.floor(v)
+                pose += [round(v - base, 6), base % 2]
+            else:
+                pose.append(round(v, 6))
+        return tuple(pose) + (round(t.rotation % 360, 6), t.brush_on)
+
+    def memo_call(tur, name):
+        """memo_call applies the memoized effect of a drawing function, if it was memoized
+        at the same relative pose: it stamps the recorded pixels and applies the recorded
+        change of the turtle pose. Otherwise it returns a `MemoCall` recording the effect,
+        while the `Execution` runs the function."""
+        t = tur.turtle
+        key = (name,) + tur.pose(relative=True)
+        effect = tur.memo.get(key)
+        if effect is None: return MemoCall(tur, key)
+
+        bx, by = int(math.floor(t.pos_x)), int(math.floor(t.pos_y))
+        offsets, dx, dy, rotation, brush_on = effect
+        pixels = [(bx + px, by + py) for px, py in offsets]
+        t.set_pixels(pixels)
+        if t.recording is not None: t.recording.extend(pixels)
+        t.pos_x += dx
+        t.pos_y += dy
+        t.rotation += rotation
+        t.brush_on = brush_on
+        return None
+
+    def run_profiled(tur, program):
+        """run_profiled runs the program with a new `Profiler` and returns it.
+        Functions are not inlined and not memoized while profiling, and the
+        last op of a profiled function leaves it, so that there are no tail calls."""
+        t = tur.turtle
+        prev, profiler = tur.profiler, Profiler(t)
+        recording = t.record()
+        tur.profiler = profiler
+        try:
+            tur.run_program(program)
+        finally:
+            tur.profiler = prev
+            t.stop_recording(recording)
+            for key in [k for k in tur.compiled if k[2] is profiler]: del tur.compiled[key]
+            del profiler.stack[:]
+        return profiler
+
+    def profile(tur, cmds):
+        """profile runs the commands and prints the profiler stats"""
+        tur.print_text(tur.run_profiled(tur.create_program(cmds)).format())
+
+    def trace(tur, cmd, fn, args):
+        log.debug('running: %s%s', cmd, tuple(args))
+        fn(*args)
 
     def repeat(tur, num, cmds):
         program = tur.create_program(cmds)
@@ -234,12 +610,20 @@ class BaseVM(ConsolePrinter):
 
     def help(tur): tur.print_text(usage)
 
+    def clear(tur):
+        # the method is looked up for each call, since it may be wrapped, e.g., while recording the history
+        tur.turtle.clear()
+
     def reset(tur):
         tur.turtle.pos_x = 0
         tur.turtle.pos_y = 0
         tur.turtle.rotation = 0
         tur.turtle.clear()
 
+    def definitions(tur):
+        """definitions returns the names of all user-defined commands"""
+        return list(tur.funcs)
+
     def format_func(tur, cmd):
         fn = tur.funcs.get(cmd)
         if fn is None: return cmd
@@ -247,16 +631,51 @@ class BaseVM(ConsolePrinter):
         return '{} -> {}'.format(cmd, ' '.join(program))
 
 
+class WithLSystems(object):
+    """WithLSystems adds L-systems to the Turtle VM. An L-system is declared with
+    its name, axiom, rewrite rules, and optional angle and step size:
+
+        lsystem koch "F" "F=F+F-F-F+F" 90 2
+
+    and drawn using its name and the number of rewrites: `koch 4`.
+    """
+    def __init__(tur):
+        super().__init__()
+        tur.lsystems = {}
+
+    def add_lsystem(tur, name, axiom, rules, angle=90, step=2):
+        log.debug("adding lsystem: %s", name)
+        if name in tur.reserved_commands:
+            raise ValueError('cannot override builtin command: {}'.format(name))
+        system = LSystem(axiom, LSystem.parse_rules(rules), angle, step)
+        def draw_lsystem(depth=1): system.draw(tur.turtle, int(depth))
+        tur.funcs.pop(name, None)
+        tur.invalidate()
+        tur.commands[name] = draw_lsystem
+        tur.lsystems[name] = system
+
+    def add_func(tur, cmd, commands):
+        super().add_func(cmd, commands)
+        tur.lsystems.pop(cmd, None)
+
+    def definitions(tur):
+        return super().definitions() + list(tur.lsystems)
+
+    def format_func(tur, cmd):
+        system = tur.lsystems.get(cmd)
+        if system is None: return super().format_func(cmd)
+        strings = ['"{}"'.format(v.replace('\\', '\\\\').replace('"', '\\"')) for v in system.format()]
+        return 'lsystem {} {} {} {}'.format(cmd, ' '.join(strings), system.angle, system.step)
+
+
 class WithAnimate(object):
-    """WithAnimate add the `animate` command to the Turtle VM"""
+    """WithAnimate add the `animate` command to the Turtle VM, drawing the frames in-process"""
     def __init__(tur):
         super().__init__()
         tur.add_command('animate', tur.animate)
+        tur.fps = 24  # default frames per second of animations, 0: as fast as possible
 
-    def clear_screen(tur):
-        os.system('cls' if os.name == 'nt' else 'clear')
-
-    def animate(tur, num, *cmds):
+    def animate(tur, num, fps, *cmds):
         program = tur.create_program(cmds)
         calls = []
         animation_args = ()
@@ -273,25 +692,37 @@ class WithAnimate(object):
             calls = [(tur.commands[cmd], args) for cmd, args in program]
             animation = _animation
 
+        fps = tur.fps if fps is None else fps
+        delay = 1.0 / fps if fps > 0 else 0.0
+        # frames are drawn in the REPL's screen region or in a region for the animation,
+        # only updating the changed cells, and printed as a whole if there is no terminal
+        screen = getattr(tur, 'screen', None)
+        own_screen = screen is None and sys.stdout.isatty()
+        if own_screen: screen = Region(reserve=1)
+        if screen is not None and screen.size is None: screen.begin()
+
         # since debug logging will destroy the animation, we need to temporary disable it
         level = log.getEffectiveLevel()
         try:
             log.setLevel(logging.INFO)
-            # TODO (uj): use curses animate
-            # animate(tur.turtle, fn)
-            i = 0
-            while True:
+            tur.print_text("# press Ctrl-C to stop animation")
+            deadline = clock()
+            for _ in (count() if num is None else range(int(num))):
+                stats = tur.turtle.stats
+                if stats is not None: stats.begin_tick(tur.turtle)
                 animation(*animation_args)
-                tur.clear_screen()
-                tur.print_text("# press Ctrl-C to stop animation")
-                tur.print_frame()
-                time.sleep(1.0/24.0)
-                if   num is None: continue
-                elif i > num:     break
-                else:             i += 1
+                if screen is None: tur.print_frame()
+                else:              screen.draw(tur.turtle)
+                if stats is not None: stats.end_tick(tur.turtle)
+                # frames are paced by deadlines, so the time spent drawing does not slow down the animation
+                deadline += delay
+                wait = deadline - clock()
+                if   wait > 0:      time.sleep(wait)
+                elif wait < -delay: deadline = clock()  # skip the deadlines of late frames instead of rushing
         except KeyboardInterrupt:
             tur.print_text("\n# stopped animation")
         finally:
+            if own_screen: screen.end()
             log.setLevel(level)
 
 
@@ -300,31 +731,101 @@ class WithSaveAndLoad(object):
         super().__init__()
         tur.add_command('save', tur.save)
         tur.add_command('load', tur.load)
+        tur.use_cache = True
+        tur.cache_dir = None
 
     def save(tur, filename='.turtille'):
         # TODO: preserve comments
         with open(filename, 'wb') as f:
-            for name in tur.funcs:
+            for name in tur.definitions():
                 text = tur.format_func(name)
                 f.write('    {}\n'.format(text).encode())
                 log.debug("saved func: %s", text)
         log.info('saved: %s', list(tur.funcs))
 
-    def load(tur, filename='.turtille', silent=False):
+    def load(tur, filename='.turtille', silent=False, write_cache=True):
+        """load defines the functions of a Turtille file and returns the program
+        of its remaining commands, reusing the parse results from the cache file
+        if the file and the grammar did not change since it was last parsed.
+        With `write_cache=False`, a missing cache file is not written."""
         if silent: info = log.debug
         else:      info = log.info
         program = []
         try:
-            with open(filename, 'rb') as f:
-                for line in f:
-                    program.extend(tur.parse(line.decode()))
-            if silent: info = log.debug
-            else:      info = log.info
-            info('loaded functions from %s', filename)
+            with open(filename, 'rb') as f: source = f.read()
         except IOError:
             info('nothing to load from %s', filename)
+            return program
+
+        key = hashlib.sha1((grammar_version + cache_format).encode() + source).hexdigest()
+        cached = tur.load_cache(filename, key) if tur.use_cache else None
+        if cached is not None:
+            program.extend(cached)
+        else:
+            try:
+                program.extend(tur.parse(source.decode()))
+                if tur.use_cache and write_cache: tur.save_cache(filename, key, tur._lark_transformer.defined, program)
+            except lark.exceptions.LarkError:
+                # e.g., a function named like a newer builtin command: load all other lines,
+                # without caching them, so that the skipped lines are reported on each load
+                program.extend(tur.parse_lines(source.decode(), filename))
+        info('loaded functions from %s', filename)
+        return program
+
+    def parse_lines(tur, text, filename):
+        """parse_lines parses the text line by line, skipping the lines that cannot be
+        parsed or defined, and returns the program of the remaining commands"""
+        program = []
+        for number, line in enumerate(text.splitlines(), 1):
+            try: program.extend(tur.parse(line))
+            except lark.exceptions.LarkError as err:
+                log.warning('skipped line %s of %s: %s', number, filename, str(err).strip().splitlines()[-1])
         return program
 
+    def cache_file(tur, filename):
+        """cache_file returns the path of the cache file for a Turtille file,
+        which is stored in `__turcache__` next to the file or in `tur.cache_dir`"""
+        if tur.cache_dir is None:
+            head, tail = os.path.split(filename)
+            return os.path.join(head, TURCACHE, tail + '.json')
+        name = hashlib.sha1(os.path.abspath(filename).encode()).hexdigest()
+        return os.path.join(tur.cache_dir, name + '.json')
+
+    def load_cache(tur, filename, key):
+        """load_cache defines the cached functions and returns the cached program
+        or returns None if there is no valid cache entry for the `key`"""
+        path = tur.cache_file(filename)
+        try:
+            with open(path, 'rb') as f: data = json.loads(f.read().decode())
+            if data['key'] != key: return None
+            defined, program = tuples(data['defined']), tuples(data['program'])
+        except (IOError, ValueError, KeyError, TypeError) as err:
+            log.debug('ignoring cache %s: %s', path, err)
+            return None
+        for kind, args in defined: tur.define(kind, *args)
+        log.debug('loaded cache: %s', path)
+        return list(program)
+
+    def save_cache(tur, filename, key, defined, program):
+        """save_cache stores the parse results of a Turtille file, skipping
+        the cache if it cannot be written"""
+        path = tur.cache_file(filename)
+        data = dict(key=key, defined=defined, program=program)
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            if not os.path.isdir(os.path.dirname(path) or '.'): os.makedirs(os.path.dirname(path))
+            with open(tmp, 'wb') as f: f.write(json.dumps(data).encode())
+            getattr(os, 'replace', os.rename)(tmp, path)
+            log.debug('saved cache: %s', path)
+        except (IOError, OSError) as err:
+            log.debug('cannot save cache %s: %s', path, err)
+
+
+def tuples(data):
+    """tuples converts the lists of decoded JSON data back to command tuples"""
+    if isinstance(data, list): return tuple(tuples(v) for v in data)
+    return data
+
 
 class Repl(BaseVM):
     """Turtille is a Turtle REPL for interactively running turtille commands and programs"""
@@ -332,7 +833,12 @@ class Repl(BaseVM):
         super().__init__()
         tur.add_command('_',    tur.last)
         tur.add_command('last', tur.last)
+        tur.add_command('undo', tur.undo)
+        tur.add_command('redo', tur.redo)
         tur.history = InMemoryHistory()
+        tur.completer = None  # WordCompleter of the commands, created again after commands changed
+        tur.changes = History(tur.turtle)  # undo and redo steps of the REPL commands
+        tur.screen = None  # :class:`drawille.screen.Region` showing the drawing above the prompt
         tur.unaries = 'up down clear quit reset u d c q'.split()
         tur.lino = 1
         tur._last_cmd = None
@@ -341,28 +847,54 @@ class Repl(BaseVM):
         """start the repl loop"""
         log.debug("starting REPL")
         tur.help()
-        while True:
-            try: tur.repl(); tur.lino += 1
-            except (StopTurtille, EOFError): return True
-            except KeyboardInterrupt:        print("Type 'q' or 'quit' to stop Turtille.")
-            except Exception as err:         print(err)  # any errors are printed to repl
+        if sys.stdout.isatty(): tur.screen = Region()
+        try:
+            while True:
+                try: tur.repl(); tur.lino += 1
+                except (StopTurtille, EOFError): return True
+                except KeyboardInterrupt:        print("Type 'q' or 'quit' to stop Turtille.")
+                except Exception as err:         print(err)  # any errors are printed to repl
+        finally:
+            if tur.screen is not None: tur.screen.end()
 
     def repl(tur):
         """run the repl once: first read the input, then execute the program"""
-        completer = WordCompleter(list(tur.commands), ignore_case=True)
+        if tur.completer is None: tur.completer = WordCompleter(list(tur.commands), ignore_case=True)
         text = prompt('Turtille [{}]: '.format(tur.lino),
                       history=tur.history,
                       lexer=TurtilleLexer,
-                      completer=completer)
+                      completer=tur.completer)
         program = tur.parse(text)
-        tur.run_program(program)
+        tur.run_undoable(program)
         if len(program) == 0 or len(program) == 1 and program[0][0] in ('h','help'):
             # don't store last command and do not refresh after showing help or for empty commands
             pass
         else:
             # in all other cases, we save the last command and print what we have
             tur.last_cmd = program[-1]
-            tur.print_frame()
+            tur.refresh()
+
+    def refresh(tur):
+        """refresh updates the changed parts of the drawing on the screen,
+        or prints the whole frame if the REPL does not use a screen region"""
+        if tur.screen is None: tur.print_frame()
+        else:                  tur.screen.draw(tur.turtle)
+
+    def invalidate(tur):
+        super().invalidate()
+        tur.completer = None  # the commands changed
+
+    def run_undoable(tur, program):
+        """run the program, recording its changes as one undo step,
+        unless the program itself undoes or redoes changes"""
+        if any(cmd[0] in ('undo', 'redo') for cmd in program): return tur.run_program(program)
+        with tur.changes.record(): tur.run_program(program)
+
+    def undo(tur):
+        if not tur.changes.undo(): tur.print_text('# nothing to undo')
+
+    def redo(tur):
+        if not tur.changes.redo(): tur.print_text('# nothing to redo')
 
     def parse(tur, text): raise NotImplementedError('initialized VM without a parser class')
 
@@ -378,65 +910,87 @@ class Repl(BaseVM):
         cmd = tur.last_cmd
         if cmd is not None: return tur.commands[cmd[0]](*cmd[1])
 
+turtille_grammar = r"""
+start: (_stmt? _NL)*
+_stmt: func | lsystem | run | comment
+
+func:    name "->" cmd+ comment?
+lsystem: _LSYSTEM name string+ [atom [atom]] comment?
+run:     cmd+ comment?
+comment: COMMENT
+
+?cmd: MOVEMENT [expr]        -> movement
+    | GOTO atom atom         -> goto
+    | name [expr]            -> cmd
+    | "animate" [expr] ["fps" expr] cmd+  -> animate
+    | "repeat" expr cmd+     -> repeat
+    | _PROFILE cmd+          -> profile
+    | TIMES cmd              -> times
+    | cmd "*" expr           -> repeated
+
+?expr: factor
+    | expr "+" factor  -> add
+    | expr "-" factor  -> sub
+?factor: atom
+    | factor "*" atom  -> mul
+    | factor "/" atom  -> div
+?atom: NUMBER          -> number
+    | "-" atom         -> neg
+    | "(" expr ")"
+
+name:   CNAME
+string: STRING
+
+MOVEMENT.2: /(forward|backward|back|left|right|f|b|l|r)\b/
+GOTO.2:     /(move|mv|m|goto|g)\b/
+TIMES.3:    /[0-9]+\s*\*(?!\s*[-0-9.(])/
+// keywords added after the first release are only keywords if followed by their
+// arguments, so that older files can still use them as function names
+_PROFILE.2: /profile(?=[ \t]+[A-Za-z_0-9])/
+_LSYSTEM.2: /lsystem(?=[ \t]+[A-Za-z_])/
+NUMBER:     /[0-9]+(\.[0-9]*)?|\.[0-9]+/
+COMMENT:    /([#;]|--)[^\n]*/
+_NL:        /\r?\n/
+
+%import common.CNAME
+%import common.ESCAPED_STRING -> STRING
+%import common.WS_INLINE
+%ignore WS_INLINE
+"""
+
+# grammar_version changes with the grammar, invalidating all cached parse results
+grammar_version = hashlib.sha1(turtille_grammar.encode()).hexdigest()
+# cache_format changes with the layout of the cache files, invalidating all cached parse results
+cache_format = '1'
+TURCACHE = '__turcache__'
+
+_turtille_parser = None
+
+def turtille_parser():
+    """turtille_parser returns the LALR parser for the Turtille grammar.
+    It is created once per process and shared by all Turtille VMs, using
+    Lark's on-disk grammar cache if the installed Lark version supports it."""
+    global _turtille_parser
+    if _turtille_parser is None:
+        options = dict(parser='lalr', lexer='contextual', maybe_placeholders=True)
+        try:              _turtille_parser = lark.Lark(turtille_grammar, cache=True, **options)
+        except TypeError: _turtille_parser = lark.Lark(turtille_grammar, **options)  # Lark<0.8
+    return _turtille_parser
+
+
 class WithLarkParser(object):
     def __init__(tur):
         super().__init__()
         tur._lark_transformer = TurtilleTransformer(tur)
-        tur._lark = lark.Lark(r"""
-        start:    func | run | comment
-        ?nl:      NL+
-        ?func:    name "->" cmd+ comment? -> func
-        ?run:     cmd+           comment? -> run
-        ?comment: (/[#;].*/ | /--.*/)     -> comment
-
-        ?cmd: MOVEMENT [expr]    -> movement
-           | GOTO expr expr      -> goto
-           | name [expr]         -> cmd
-           | "animate" expr cmd+ -> animate
-           | "animate" cmd+      -> animate
-           | "repeat" expr cmd+  -> repeat
-           | expr "*" cmd        -> repeat
-           | cmd "*"  expr       -> repeated
-
-        MOVEMENT: "f"|"b"|"l"|"r"|"forward"|"back"|"backward"|"left"|"right"
-        MOVE: "move"|"mv"|"m"
-        GOTO: MOVE|"goto"|"g"
-
-        ?expr: factor
-            | expr "+" factor  -> add
-            | expr "-" factor  -> sub
-        ?factor: atom
-            | factor "*" atom  -> mul
-            | factor "/" atom  -> div
-        ?atom: int | float
-            | "-" atom         -> neg
-            | "(" expr ")"
-
-        ?int:   INT            -> int
-        ?float: FLOAT          -> float
-
-        ?name: CNAME           -> name
-        ?arg:  CNAME           -> name
-        val:   name | expr
-
-        %import common.INT
-        %import common.FLOAT
-        %import common.WORD
-        %import common.CNAME
-        %import common.NEWLINE -> NL
-        %import common.WS_INLINE
-        %ignore WS_INLINE
-        """)
+        tur._lark = turtille_parser()
 
     def parse(tur, text):
+        """parse parses all lines of the text at once, defining the contained
+        functions and returning the program of the remaining commands"""
         tf = tur._lark_transformer
         tf.begin()
-        # TODO: add comments support in the gammar
-        lines = text.split("\n")
-        for line in lines:
-            if line.strip() == "": continue
-            tree = tur._lark.parse(line)
-            tf.transform(tree)
+        if not text.endswith("\n"): text += "\n"
+        tf.transform(tur._lark.parse(text))
 
         if len(tf.program) > 0:
             log.debug("PROGRAM:%s", "\n".join(str(cmd) for cmd in tf.program))
@@ -445,8 +999,6 @@ class WithLarkParser(object):
 @lark.v_args(inline=True)
 class TurtilleTransformer(lark.Transformer):
     from operator import add, sub, mul, truediv as div, neg
-    float = float
-    int   = int
 
     def __init__(t, tur):
         t.tur = tur  # type: Turtille
@@ -454,27 +1006,48 @@ class TurtilleTransformer(lark.Transformer):
 
     def begin(t):
         t.program = []
+        t.defined = []  # definitions in parse order, as (kind, args) for the parse cache
+
+    def define(t, kind, *args):
+        t.defined.append((kind, args))
+        t.tur.define(kind, *args)
 
     def name(t, token):               return token.value
-    def comment(t, token):          return ('comment', (token.value,))
-    def movement(t, token, *args): return t.call(token.value[0], *args)
+    def number(t, token):             return float(token) if '.' in token else int(token)
+    def comment(t, token):            return ('comment', (token.value,))
+    def movement(t, token, *args):    return t.call(token.value[0], *args)
     def call(t, cmd, *args):
+        args = tuple(a for a in args if a is not None)  # drop missing optional args
         if len(args) == 0:
             if   cmd in ('r','l','right','left'):               args = (45,)  # turn 45 deggree by default
             elif cmd in ('f','b','forward','backward', 'back'): args = (20,)  # move 20 steps by default
         return (cmd, args)
 
-    def goto(t, name, x, y):          return (name, (x, y))
+    def goto(t, token, x, y):         return ('move', (x, y))
     def cmd(t, name, *args):          return t.call(name, *args)
-    def animate(t, *args):            return t.call('animate', *args)
+    def animate(t, num, fps, *cmds):  return ('animate', (num, fps) + cmds)
     def repeat(t, num, *cmds):        return t.call('repeat', num, cmds)
+    def profile(t, *cmds):            return t.call('profile', cmds)
+    def times(t, token, cmd):         return t.repeat(int(token.value.rstrip('*')), cmd)
     def repeated(t, cmd, num):        return t.repeat(num, cmd)
-    def func(t, name, *cmds):         t.tur.add_func(name, cmds)
+    def func(t, name, *cmds):         t.define('func', name, cmds)
+    def string(t, token):             return ast.literal_eval(token.value)
+    def lsystem(t, name, *args):
+        strings = [a for a in args if isinstance(a, str)]
+        numbers = [a for a in args if isinstance(a, (int, float))]
+        t.define('lsystem', name, strings[0], strings[1:], *numbers)
+    def start(t, *stmts):             return t.program
     def run(t, *cmds):                t.program.extend(cmds)
 
-class Turtille(WithLarkParser, WithAnimate, WithSaveAndLoad, Repl):
-    def __init__(tur):
+class Turtille(WithLarkParser, WithAnimate, WithSaveAndLoad, WithLSystems, Repl):
+    def __init__(tur, use_cache=True, cache_dir=None):
+        """
+        :param use_cache: read and write the `__turcache__` files of loaded Turtille files
+        :param cache_dir: (optional) directory of the cache files, default: next to the loaded files
+        """
         super().__init__()
-        tur.load(silent=True)
+        tur.use_cache = use_cache
+        tur.cache_dir = cache_dir
+        tur.load(silent=True, write_cache=False)  # creating a Turtille never writes files
 
 
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU AGPL (see LICENSE file or http://www.gnu.org/licenses)
+
+"""
+Incremental drawing of frames in a fixed region of an ANSI terminal.
+
+A :class:`Region` keeps the top lines of the terminal for a drawing and sets
+the scrolling region of the terminal to the lines below it, so that prompts
+and other output scroll underneath the drawing without moving it. Each update
+only writes the part of each line that changed since the previous update:
+
+    from drawille import Turtle
+    from drawille.screen import Region
+
+    t, region = Turtle(), Region()
+    for _ in range(36):
+        t.forward(10); t.right(170)
+        region.draw(t)
+    region.end()
+
+The cursor is saved before and restored after each update, so the update can
+happen while the cursor is in the scrolling part, e.g., at a prompt.
+
+A :class:`TerminalSession` caches the terminal size and only reads it again
+after the terminal sent a SIGWINCH, instead of asking the terminal for each
+frame. It clips frames to the viewport, so cells that do not fit into the
+terminal are never rendered:
+
+    with TerminalSession() as session:
+        print(t.frame(*session.fit(t)))
+"""
+
+from __future__ import absolute_import
+from builtins import super
+
+import signal, sys
+from drawille.canvas import colrow, get_terminal_size
+from drawille.plot import DensityCanvas
+
+ESC = '\x1b'
+
+
+def diff_line(old, new):
+    """diff_line returns the column and text to write over `old` to get `new`,
+    and whether the rest of the line must be cleared, or None if they are equal"""
+    if old == new: return None
+    n = min(len(old), len(new))
+    start = 0
+    while start < n and old[start] == new[start]: start += 1
+    if len(old) != len(new): return start, new[start:], len(new) < len(old)
+    end = len(new)
+    while end > start and old[end - 1] == new[end - 1]: end -= 1
+    return start, new[start:end], False
+
+
+def extent(canvas):
+    """extent returns the (min_x, min_y, max_x, max_y) pixel bounds of the cells of a canvas, or None if it is empty.
+    The segments of a display list are included without rendering them."""
+    if isinstance(canvas, DensityCanvas): canvas.render()      # the cells are only updated when rendering
+    if hasattr(canvas, 'flush'):          canvas.flush()       # buffered turtle segments
+    chars = canvas.chars
+    rows = [row for row in chars if chars[row]]
+    cols = [col for row in rows for col in (min(chars[row]), max(chars[row]))]
+    cells = [(min(cols), min(rows), max(cols), max(rows))] if rows else []
+    display_list = getattr(canvas, 'display_list', None)
+    bounds = display_list.bounds() if display_list is not None else None
+    if bounds is not None: cells.append(colrow(bounds[0], bounds[1]) + colrow(bounds[2], bounds[3]))
+    if not cells: return None
+    return (min(c[0] for c in cells) * 2,       min(c[1] for c in cells) * 4,
+            (max(c[2] for c in cells) + 1) * 2, (max(c[3] for c in cells) + 1) * 4)
+
+
+class TerminalSession(object):
+    """TerminalSession caches the size of the terminal, updating it after a SIGWINCH,
+    and fits frames of canvases to the viewport of the terminal"""
+
+    def __init__(self, reserve=0, size=None):
+        """
+        :param reserve: number of lines not used by the viewport, e.g., for a prompt
+        :param size: (optional) fixed (columns, lines) size of the terminal
+        """
+        super().__init__()
+        self.reserve = reserve
+        self.fixed_size = size
+        self.handler = None  # previous SIGWINCH handler, while the session is open
+        self.stale = True    # the cached size must be read again
+
+
+    def open(self):
+        """Start updating the size on SIGWINCH. Without the signal, e.g., on Windows or
+        outside of the main thread, the size is read each time it is used."""
+        if self.fixed_size is not None or self.handler is not None: return self
+        previous = [None]
+        def resized(signum, frame):
+            self.stale = True
+            if callable(previous[0]): previous[0](signum, frame)
+        try:
+            previous[0] = signal.signal(signal.SIGWINCH, resized)
+            self.handler = previous
+        except (AttributeError, ValueError):
+            pass
+        self.stale = True
+        return self
+
+
+    def close(self):
+        """Restore the previous SIGWINCH handler."""
+        if self.handler is None: return
+        signal.signal(signal.SIGWINCH, self.handler[0] if self.handler[0] is not None else signal.SIG_DFL)
+        self.handler = None
+
+
+    def __enter__(self): return self.open()
+
+    def __exit__(self, *exc): self.close()
+
+
+    @property
+    def size(self):
+        """(columns, lines) of the terminal"""
+        if self.fixed_size is not None: return tuple(self.fixed_size)
+        if self.stale or self.handler is None:
+            self._size = tuple(get_terminal_size())
+            self.stale = False
+        return self._size
+
+
+    def viewport(self, min_x=0, min_y=0):
+        """viewport returns the (min_x, min_y, max_x, max_y) pixel bounds of the terminal
+        cells below the reserved lines, with the top left pixel at min_x, min_y"""
+        columns, lines = self.size
+        return min_x, min_y, min_x + columns * 2, min_y + max(1, lines - self.reserve) * 4
+
+
+    def fit(self, canvas, min_x=None, min_y=None, max_x=None, max_y=None):
+        """fit returns the pixel bounds for a frame of the canvas that fits into the viewport.
+        The frame starts at the given minimum or at the top left cell of the drawing,
+        and ends at the given maximum or at the end of the drawing, if it fits."""
+        bounds = extent(canvas) or (0, 0, None, None)
+        min_x = bounds[0] if min_x is None else min_x - min_x % 2
+        min_y = bounds[1] if min_y is None else min_y - min_y % 4
+        max_x = bounds[2] if max_x is None else max_x
+        max_y = bounds[3] if max_y is None else max_y
+        _, _, view_x, view_y = self.viewport(min_x, min_y)
+        return (min_x, min_y,
+                view_x if max_x is None else min(max_x, view_x),
+                view_y if max_y is None else min(max_y, view_y))
+
+
+class Region(object):
+    """Region draws lines at the top of the terminal, rewriting only the changed parts of each line."""
+
+    def __init__(self, out=None, reserve=8, size=None):
+        """
+        :param out: (optional) output stream, default: `sys.stdout`
+        :param reserve: number of lines kept for scrolling output below the region
+        :param size: (optional) fixed (columns, lines) size of the terminal
+        """
+        super().__init__()
+        self.out = out or sys.stdout
+        self.session = TerminalSession(reserve, size)
+        self.size = None   # terminal size when the region was set up, None: not set up
+        self.lines = []    # lines on the screen
+
+
+    @property
+    def height(self):
+        return max(1, self.size[1] - self.session.reserve)
+
+
+    def begin(self):
+        """Clear the screen and set the scrolling region below the drawing region."""
+        self.size = self.session.open().size
+        self.lines = []
+        self.write('{0}[2J{0}[{1};{2}r{0}[{1};1H'.format(ESC, self.height + 1, self.size[1]))
+
+
+    def end(self):
+        """Reset the scrolling region of the terminal."""
+        if self.size is None: return
+        self.write('{0}[r{0}[{1};1H'.format(ESC, self.size[1]))
+        self.size = None
+        self.session.close()
+
+
+    def write(self, text):
+        self.out.write(text)
+        self.out.flush()
+
+
+    def update(self, lines):
+        """Draw the lines, clipped to the region, and return the number of written characters.
+        The region is set up again if the terminal size changed."""
+        if self.session.size != self.size: self.begin()
+        width, height = self.size[0], self.height
+
+        lines = [line[:width] for _, line in zip(range(height), lines)]
+        lines.extend([''] * (len(self.lines) - len(lines)))
+        out = []
+        for row, new in enumerate(lines):
+            change = diff_line(self.lines[row] if row < len(self.lines) else '', new)
+            if change is None: continue
+            col, text, clear = change
+            out.append('{}[{};{}H{}{}'.format(ESC, row + 1, col + 1, text, ESC + '[K' if clear else ''))
+        self.lines = lines
+        while self.lines and not self.lines[-1]: self.lines.pop()
+
+        if not out: return 0
+        text = ESC + '7' + ''.join(out) + ESC + '8'
+        self.write(text)
+        return len(text)
+
+
+    def draw(self, canvas, min_x=None, min_y=None, max_x=None, max_y=None):
+        """Draw the part of the canvas fitting into the region, only rendering the visible cells."""
+        if hasattr(canvas, 'snapshot'): canvas = canvas.snapshot()  # e.g., of a ConcurrentCanvas
+        return self.update(canvas.rows(*self.session.fit(canvas, min_x, min_y, max_x, max_y)))
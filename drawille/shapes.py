@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU AGPL (see LICENSE file or http://www.gnu.org/licenses)
+
+"""
+Shape templates for drawing the same shape many times at different positions.
+
+A :class:`Template` is a shape rasterized once into pixel offsets around its
+center. For each of the 2x4 possible pixel alignments within a braille cell,
+the offsets are also pre-combined into cell masks, so that stamping a
+template onto a canvas costs one operation per cell instead of per pixel.
+
+Templates are memoized in a :class:`TemplateCache` with LRU eviction:
+
+    from drawille import Canvas
+    from drawille.shapes import polygon_template
+
+    c = Canvas()
+    hexagon = polygon_template(sides=6, radius=5)
+    for x in range(0, 100, 12): hexagon.stamp(c, x, 10)
+"""
+
+from __future__ import absolute_import
+from builtins import super
+
+import math
+from collections import OrderedDict
+from drawille.canvas import iround, line, pixel_map
+
+
+class Template(object):
+    """Template is a set of pixel offsets relative to the center of a shape."""
+
+    def __init__(self, offsets):
+        super().__init__()
+        self.offsets = frozenset(offsets)
+        self._masks = {}
+
+
+    def masks(self, align_x, align_y):
+        """Return the cell masks of the template for a center at a pixel with
+        `x % 2 == align_x` and `y % 4 == align_y`, as a tuple of
+        `(row offset, ((col offset, mask), ...))` items.
+        """
+        key = (align_x, align_y)
+        if key not in self._masks:
+            cells = {}
+            for dx, dy in self.offsets:
+                x, y = dx + align_x, dy + align_y
+                row = cells.setdefault(y >> 2, {})
+                row[x >> 1] = row.get(x >> 1, 0) | pixel_map[y & 3][x & 1]
+            self._masks[key] = tuple((r, tuple(cols.items())) for r, cols in cells.items())
+        return self._masks[key]
+
+
+    def pixels(self, x, y):
+        """Yields the pixel coordinates of the template centered at x, y."""
+        x = iround(x)
+        y = iround(y)
+        for dx, dy in self.offsets:
+            yield x + dx, y + dy
+
+
+    def stamp(self, canvas, x, y):
+        """Set the pixels of the template centered at x, y on the canvas.
+        The center is rounded to the nearest pixel.
+
+        :param canvas: :class:`drawille.canvas.Canvas` object
+        :param x: x coordinate of the center
+        :param y: y coordinate of the center
+        """
+        canvas.stamp(self, iround(x), iround(y))
+
+
+    def __len__(self):
+        return len(self.offsets)
+
+
+class TemplateCache(object):
+    """TemplateCache memoizes templates by key, evicting the least recently
+    used template when more than `maxsize` templates are stored."""
+
+    def __init__(self, maxsize=256):
+        super().__init__()
+        self.maxsize = maxsize
+        self.templates = OrderedDict()
+
+
+    def get(self, key, create):
+        """Return the template for `key`, calling `create()` to rasterize it if needed."""
+        templates = self.templates
+        template = templates.pop(key, None)
+        if template is None:
+            template = create()
+            while len(templates) >= self.maxsize:
+                templates.popitem(last=False)
+        templates[key] = template
+        return template
+
+
+    def clear(self):
+        self.templates.clear()
+
+
+templates = TemplateCache()
+
+
+def polygon_points(sides=4, radius=4, rotation=0):
+    """Return the vertices of a regular polygon centered at 0, 0.
+
+    :param sides: number of sides
+    :param radius: distance of the vertices from the center
+    :param rotation: rotation of the first vertex in degrees
+    """
+    degree = 360.0 / float(sides)
+    return [(math.cos(math.radians(rotation + n * degree)) * radius,
+             math.sin(math.radians(rotation + n * degree)) * radius)
+            for n in range(sides)]
+
+
+def fill_polygon(points):
+    """Yields the pixel coordinates inside a polygon, using an even-odd scanline fill.
+
+    :param points: list of (x, y) vertices
+    """
+    edges = list(zip(points, points[1:] + points[:1]))
+    min_y = int(math.ceil(min(y for _, y in points)))
+    max_y = int(math.floor(max(y for _, y in points)))
+
+    for y in range(min_y, max_y + 1):
+        xs = sorted(x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+                    for (x1, y1), (x2, y2) in edges
+                    if (y1 <= y < y2) or (y2 <= y < y1))
+        for left, right in zip(xs[0::2], xs[1::2]):
+            for x in range(int(math.ceil(left)), int(math.floor(right)) + 1):
+                yield x, y
+
+
+def polygon_template(sides=4, radius=4, rotation=0, fill=False, cache=templates):
+    """Return the memoized :class:`Template` of a regular polygon.
+
+    :param sides: number of sides
+    :param radius: distance of the vertices from the center
+    :param rotation: rotation of the first vertex in degrees
+    :param fill: if True, the polygon is filled
+    :param cache: (optional) :class:`TemplateCache` to use
+    """
+    def create():
+        points = polygon_points(sides, radius, rotation)
+        offsets = set()
+        for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]):
+            offsets.update((iround(x), iround(y)) for x, y in line(x1, y1, x2, y2))
+        if fill:
+            offsets.update(fill_polygon(points))
+        return Template(offsets)
+
+    return cache.get(('polygon', sides, radius, rotation, fill), create)
+
+
+def circle_template(radius=4, fill=False, cache=templates):
+    """Return the memoized :class:`Template` of a circle, rasterized with
+    the midpoint circle algorithm.
+
+    :param radius: Integer. Radius of the circle.
+    :param fill: if True, the circle is filled
+    :param cache: (optional) :class:`TemplateCache` to use
+    """
+    def create():
+        offsets = set()
+        x, y, err = radius, 0, 1 - radius
+        while x >= y:
+            for dx, dy in ((x, y), (y, x)):
+                if fill:
+                    offsets.update((i, dy) for i in range(-dx, dx + 1))
+                    offsets.update((i, -dy) for i in range(-dx, dx + 1))
+                else:
+                    offsets.update(((dx, dy), (-dx, dy), (dx, -dy), (-dx, -dy)))
+            y += 1
+            if err < 0:
+                err += 2 * y + 1
+            else:
+                x -= 1
+                err += 2 * (y - x) + 1
+        return Template(offsets)
+
+    return cache.get(('circle', radius, fill), create)
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU AGPL (see LICENSE file or http://www.gnu.org/licenses)
+
+"""
+Opt-in instrumentation of a :class:`drawille.canvas.Canvas`.
+
+A canvas does not measure anything by default. Calling
+:meth:`Canvas.enable_stats` wraps the drawing and rendering methods of that
+one canvas instance with counting versions, so other canvases and the
+methods of the canvas class are not affected:
+
+    from drawille import Canvas
+
+    c = Canvas()
+    stats = c.enable_stats()
+    stats.add_hook(lambda event, canvas, **info: print(event, info.get('seconds')))
+    c.set(1, 1)
+    c.frame()
+    print(stats.to_dict())
+
+Hooks are called with one of the events `before_frame`, `after_frame`,
+`before_rows`, `after_rows`, `before_tick`, and `after_tick`. The `after_*`
+events also pass the elapsed `seconds`, `after_frame` passes the `text`,
+`after_rows` the number of `rows`, and the tick events the `tick` number.
+"""
+
+from __future__ import absolute_import
+from builtins import super
+
+import time
+from bisect import bisect_left
+from collections import Counter
+
+clock = getattr(time, 'perf_counter', time.time)
+
+# upper bounds of the render time histogram buckets in milliseconds
+render_buckets = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, float('inf'))
+
+# methods of a canvas counting the pixel operations
+pixel_ops = ('set', 'unset', 'toggle', 'set_text')
+
+
+class CanvasStats(object):
+    """CanvasStats counts the pixel operations and measures the rendering of a canvas."""
+
+    def __init__(self, buckets=render_buckets):
+        super().__init__()
+        self.buckets = buckets
+        self.hooks = []
+        self.reset()
+
+
+    def reset(self):
+        """Reset all counters and the render time histogram."""
+        self.ops = Counter()                         # pixel operation -> number of pixels
+        self.frames = 0                              # number of rendered frames
+        self.rows = 0                                # number of rendered rows
+        self.bytes = 0                               # utf-8 size of all rendered frames
+        self.ticks = 0                               # number of animation ticks
+        self.cells = 0                               # allocated cells at the last frame
+        self.max_cells = 0                           # highest number of allocated cells
+        self.render_times = [0] * len(self.buckets)  # frames per render time bucket
+        self.render_time = 0.0                       # total render time in seconds
+
+
+    def add_hook(self, hook):
+        """Add a callable `hook(event, canvas, **info)`, called around frames, rows and animation ticks."""
+        self.hooks.append(hook)
+
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+
+    def emit(self, event, canvas, **info):
+        for hook in self.hooks: hook(event, canvas, **info)
+
+
+    def install(self, canvas):
+        """Wrap the methods of the canvas instance with counting methods."""
+        ops, nested = self.ops, [False]
+
+        def counting(name, fn, pixels=lambda *args: 1):
+            # pixel operations calling other pixel operations, e.g., `toggle` calling `set`, are counted once
+            def count(*args):
+                if nested[0]: return fn(*args)
+                ops[name] += pixels(*args)
+                nested[0] = True
+                try:     return fn(*args)
+                finally: nested[0] = False
+            return count
+
+        def rows(min_x=None, min_y=None, max_x=None, max_y=None, **kwargs):
+            self.emit('before_rows', canvas)
+            start, n = clock(), 0
+            for row in rows.wrapped(min_x, min_y, max_x, max_y, **kwargs):
+                n += 1
+                yield row
+            self.rows += n
+            self.emit('after_rows', canvas, rows=n, seconds=clock() - start)
+
+        def frame(min_x=None, min_y=None, max_x=None, max_y=None, **kwargs):
+            self.emit('before_frame', canvas)
+            start = clock()
+            text = frame.wrapped(min_x, min_y, max_x, max_y, **kwargs)
+            self.add_frame(canvas, text, clock() - start)
+            self.emit('after_frame', canvas, text=text, seconds=clock() - start)
+            return text
+
+        for name in pixel_ops:
+            setattr(canvas, name, counting(name, getattr(canvas, name)))
+        set_pixels = counting('set', canvas.set_pixels, len)
+        canvas.set_pixels = lambda points: set_pixels(list(points))
+        canvas.stamp = counting('set', canvas.stamp, lambda template, x, y: len(template))
+        for fn in (rows, frame):
+            fn.wrapped = getattr(canvas, fn.__name__)
+            setattr(canvas, fn.__name__, fn)
+
+
+    def uninstall(self, canvas):
+        """Remove the counting methods from the canvas instance."""
+        for name in pixel_ops + ('set_pixels', 'stamp', 'rows', 'frame'):
+            canvas.__dict__.pop(name, None)
+
+
+    def add_frame(self, canvas, text, seconds):
+        """Count a rendered frame and the memory used by the canvas."""
+        self.frames += 1
+        self.bytes += len(text) if isinstance(text, bytes) else len(text.encode('utf-8'))
+        self.cells = sum(len(row) for row in canvas.chars.values())
+        self.max_cells = max(self.max_cells, self.cells)
+        self.render_time += seconds
+        self.render_times[bisect_left(self.buckets, seconds * 1000)] += 1
+
+
+    def begin_tick(self, canvas):
+        """Start an animation tick, called by :func:`drawille.canvas.animate` for each frame."""
+        self.ticks += 1
+        self.tick_start = clock()
+        self.emit('before_tick', canvas, tick=self.ticks)
+
+
+    def end_tick(self, canvas):
+        self.emit('after_tick', canvas, tick=self.ticks, seconds=clock() - self.tick_start)
+
+
+    def to_dict(self):
+        """Return all counters and the render time histogram, e.g., for exporting them as JSON."""
+        return dict(ops=dict(self.ops), frames=self.frames, rows=self.rows, bytes=self.bytes,
+                    ticks=self.ticks, cells=self.cells, max_cells=self.max_cells,
+                    render_time=self.render_time,
+                    render_ms=[(bound if bound != float('inf') else None, n)
+                               for bound, n in zip(self.buckets, self.render_times)])
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+# License: GNU AGPL (see LICENSE file or http://www.gnu.org/licenses)
+
+"""
+Plotting of coordinate records streamed from a file, e.g., from stdin.
+
+Records are read in large chunks and each chunk is parsed in bulk into a flat
+array of values, which is added to a :class:`drawille.plot.Plot` at once:
+
+    cat telemetry.txt | drawille plot                         # "x y" lines
+    cat telemetry.csv | drawille plot --format text           # "x,y" lines
+    producer | drawille plot --format float32 --window 100000 # packed pairs
+
+Text records are `x y` pairs separated by spaces, tabs, or commas, one per
+line. Lines that are not numbers, e.g., CSV headers, are skipped. Binary
+records are pairs of native-endian int32 or float32 values. Records with nan
+or infinite values are skipped. With `series`, each record is a single y
+value and the record index is used as x value.
+"""
+
+from __future__ import absolute_import
+from builtins import super
+
+import os, re
+from array import array
+from math import isinf, isnan
+from collections import deque
+from drawille.canvas import IS_PY2
+from drawille.plot import Plot, POINTS
+
+TEXT    = 'text'
+INT32   = 'int32'
+FLOAT32 = 'float32'
+
+formats = (TEXT, INT32, FLOAT32)
+
+def typecode(fmt):
+    """typecode returns the array typecode of a binary format"""
+    if fmt == FLOAT32: return 'f'
+    return next(t for t in 'ilh' if array(t).itemsize == 4)
+
+
+def read_chunks(f, chunk_size=1 << 20):
+    """read_chunks yields chunks of bytes from a file, returning the available
+    bytes of pipes and terminals without waiting for the full chunk"""
+    try:                                           fd = f.fileno()
+    except (AttributeError, IOError, ValueError): fd = None  # e.g., io.BytesIO
+    while True:
+        data = os.read(fd, chunk_size) if fd is not None else f.read(chunk_size)
+        if not data: return
+        yield data
+
+
+def finite(values):
+    """finite returns whether all values are neither infinite nor nan,
+    using the sum, which is nan or infinite if any value is"""
+    total = sum(values)
+    return not (isinf(total) or isnan(total))
+
+
+def finite_records(values, width=2):
+    """finite_records returns the values of the records without nan or infinite values"""
+    if finite(values): return values
+    records = (values[i:i + width] for i in range(0, len(values) - width + 1, width))
+    return array(values.typecode, [v for record in records if finite(record) for v in record])
+
+
+_record_lines = {}
+
+def record_lines(width):
+    """record_lines returns a regex matching text consisting only of lines with `width` fields"""
+    if width not in _record_lines:
+        sep, field = br'[\t\x0b\x0c\r ,]', br'[^\s,]+'
+        line = sep + b'*' + field + (b'(?:' + sep + b'+' + field + b')') * (width - 1) + sep + b'*'
+        _record_lines[width] = re.compile(b'(?:' + line + br'\n)*(?:' + line + br')?\Z')
+    return _record_lines[width]
+
+
+def parse_text(data, width=2):
+    """parse_text returns the values of the text records as array of floats,
+    skipping lines that do not contain `width` finite numbers"""
+    try:
+        # the fast path requires `width` values on each line and only finite values
+        if record_lines(width).match(data):
+            values = array('d', map(float, data.replace(b',', b' ').split()))
+            if finite(values): return values
+    except ValueError:
+        pass
+    # slow path for chunks with headers, incomplete records, or non-finite values
+    values = array('d')
+    for line in data.splitlines():
+        fields = line.replace(b',', b' ').split()
+        if len(fields) != width: continue
+        try:              record = [float(v) for v in fields]
+        except ValueError: continue
+        if finite(record): values.extend(record)
+    return values
+
+
+def text_records(chunks, width=2):
+    """text_records yields arrays of values from chunks of text lines,
+    keeping incomplete lines until the next chunk"""
+    rest = b''
+    for data in chunks:
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            rest += data
+            continue
+        yield parse_text(rest + data[:end], width)
+        rest = data[end:]
+    if rest.strip(): yield parse_text(rest, width)
+
+
+def binary_records(chunks, fmt, width=2):
+    """binary_records yields arrays of values from chunks of packed binary records,
+    keeping incomplete records until the next chunk"""
+    code = typecode(fmt)
+    size = array(code).itemsize * width
+    rest = b''
+    for data in chunks:
+        if rest: data = rest + data
+        end = len(data) - len(data) % size
+        values = array(code)
+        if IS_PY2: values.fromstring(bytes(data[:end]))
+        else:      values.frombytes(data[:end])
+        rest = data[end:]
+        yield finite_records(values, width) if code == 'f' else values
+
+
+def records(f, fmt=TEXT, width=2, chunk_size=1 << 20):
+    """records yields arrays of interleaved values read from the file `f`"""
+    chunks = read_chunks(f, chunk_size)
+    if fmt == TEXT: return text_records(chunks, width)
+    if fmt in formats: return binary_records(chunks, fmt, width)
+    raise ValueError("Unsupported record format <{0}>".format(fmt))
+
+
+class StreamPlot(object):
+    """StreamPlot plots arrays of streamed values, optionally keeping only the last
+    `window` records. The other arguments are passed to :class:`drawille.plot.Plot`."""
+
+    def __init__(self, window=None, series=False, mode=POINTS, **plot_args):
+        super().__init__()
+        self.window = window    # number of records to keep, None: all records
+        self.series = series    # values are y values, with the record index as x value
+        self.plot = Plot(mode=mode, **plot_args)
+        self.chunks = deque()   # (index of the first record, values) of the records in the window
+        self.count = 0          # number of added records
+
+
+    @property
+    def canvas(self): return self.plot.canvas
+
+
+    def add(self, values):
+        """Add an array of interleaved x, y values, or y values of a series."""
+        width = 1 if self.series else 2
+        n = len(values) // width
+        if n == 0: return
+        if self.window is None:
+            self.add_to_plot(self.count, values)
+        else:
+            self.chunks.append((self.count, values))
+            start = self.count + n - self.window
+            while self.chunks and self.chunks[0][0] + len(self.chunks[0][1]) // width <= start:
+                self.chunks.popleft()
+        self.count += n
+
+
+    def add_to_plot(self, index, values, x_offset=0):
+        if self.series:
+            self.plot.add(range(index - x_offset, index - x_offset + len(values)), values)
+        else:
+            self.plot.add(values[0::2], values[1::2])
+
+
+    def draw(self):
+        """Draw the records on the cleared canvas and return the canvas. With a `window`,
+        the plot is rebuilt from the records in the window, and series start at x = 0."""
+        if self.window is not None:
+            width = 1 if self.series else 2
+            start = max(0, self.count - self.window)
+            self.plot.clear()
+            for index, values in self.chunks:
+                skip = max(0, start - index)
+                self.add_to_plot(index + skip, values[skip * width:], x_offset=start)
+        self.canvas.clear()
+        return self.plot.draw()
+
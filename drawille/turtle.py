@@ -6,22 +6,74 @@
 from __future__ import absolute_import
 from builtins import super
 import math
-from drawille.canvas import Canvas, line
+from drawille.canvas import Canvas, IS_PY2, iround, line_pixels
+
+
+def exact(v):
+    """Snap a sine or cosine value to -1, -0.5, 0, 0.5, or 1 if it only differs by float errors."""
+    for e in (-1.0, -0.5, 0.0, 0.5, 1.0):
+        if abs(v - e) < 1e-12: return e
+    return v
+
+# unit vectors of all integer angles, exact for multiples of 30 and 90 degrees
+unit_vectors = tuple((exact(math.cos(math.radians(a))), exact(math.sin(math.radians(a)))) for a in range(360))
+
+def unit_vector(angle):
+    """Return the (cos, sin) unit vector of an angle in degrees."""
+    a = angle % 360
+    if a == int(a): return unit_vectors[int(a)]
+    r = math.radians(angle)
+    return math.cos(r), math.sin(r)
 
 
 class Turtle(Canvas):
     """Turtle graphics interface
     http://en.wikipedia.org/wiki/Turtle_graphics
+
+    Drawn line segments are buffered and rasterized in batches when the
+    canvas is rendered or read, or when `batch_size` segments are buffered.
+    Call :meth:`flush` before accessing `chars` directly.
+
+    With a :class:`drawille.display.DisplayList`, the segments are stored in
+    the display list instead and rasterized for each frame, at the scale and
+    viewport of the frame. Pixels and text set or unset directly on the turtle
+    are applied on top, without scaling: unset pixels are erased from the
+    drawn segments until a later segment draws them again. Recordings contain
+    the pixels at scale 1.
     """
 
-    def __init__(self, pos_x=0, pos_y=0):
+    batch_size = 4096  # maximum number of buffered line segments
+
+    def __init__(self, pos_x=0, pos_y=0, display_list=None):
+        self.display_list = display_list  # :class:`drawille.display.DisplayList` storing the segments, if used
         self.pos_x = pos_x
         self.pos_y = pos_y
         self.rotation = 0
         self.brush_on = True
+        self.recording = None  # list of drawn pixels, while recording
+        self.heading = (0, unit_vector(0))  # rotation and its cached unit vector
         super().__init__()
 
 
+    def clear(self):
+        """Remove all pixels and buffered line segments."""
+        self.segments = []
+        self.erased = set()  # unset pixels of the segments of the display list
+        if self.display_list is not None: self.display_list.clear()
+        super().clear()
+
+
+    def flush(self):
+        """Rasterize the buffered line segments."""
+        segments = self.segments
+        if not segments: return
+        self.segments = []
+        pixels = []
+        for x1, y1, x2, y2 in segments: pixels.extend(line_pixels(x1, y1, x2, y2))
+        self.set_pixels(pixels)
+        if self.recording is not None: self.recording.extend(pixels)
+
+
     def up(self):
         """Pull the brush up."""
         self.brush_on = False
@@ -37,8 +89,13 @@ class Turtle(Canvas):
 
         :param step: Integer. Distance to move forward.
         """
-        x = self.pos_x + math.cos(math.radians(self.rotation)) * step
-        y = self.pos_y + math.sin(math.radians(self.rotation)) * step
+        rotation, (dx, dy) = self.heading
+        if rotation != self.rotation:
+            rotation = self.rotation
+            dx, dy = unit_vector(rotation)
+            self.heading = (rotation, (dx, dy))
+        x = self.pos_x + dx * step
+        y = self.pos_y + dy * step
         prev_brush_state = self.brush_on
         self.brush_on = True
         self.move(x, y)
@@ -51,14 +108,38 @@ class Turtle(Canvas):
         :param x: x coordinate
         :param y: y coordinate
         """
-        if self.brush_on:
-            for lx, ly in line(self.pos_x, self.pos_y, x, y):
-                self.set(lx, ly)
+        if not self.brush_on:
+            pass
+        elif self.display_list is not None:
+            self.display_list.add(self.pos_x, self.pos_y, x, y)
+            if self.recording is not None or self.erased:
+                pixels = line_pixels(self.pos_x, self.pos_y, x, y)
+                if self.recording is not None: self.recording.extend(pixels)
+                self.erased.difference_update(pixels)  # drawn again
+        else:
+            self.segments.append((self.pos_x, self.pos_y, x, y))
+            if self.recording is not None or len(self.segments) >= self.batch_size: self.flush()
 
         self.pos_x = x
         self.pos_y = y
 
 
+    def record(self):
+        """Start recording the drawn pixels into a new list and return the
+        previous recording, which must be passed to :meth:`stop_recording`."""
+        self.flush()
+        prev, self.recording = self.recording, []
+        return prev
+
+
+    def stop_recording(self, prev):
+        """Stop recording and return the recorded pixels. The pixels are also
+        added to the previous, outer recording if there is one."""
+        pixels, self.recording = self.recording, prev
+        if prev is not None: prev.extend(pixels)
+        return pixels
+
+
     def right(self, angle):
         """Rotate the turtle (positive direction).
 
@@ -83,6 +164,80 @@ class Turtle(Canvas):
         self.forward(-step)
 
 
+    def unset(self, x, y):
+        self.flush()
+        if self.display_list is not None: self.erased.add((iround(x), iround(y)))
+        super().unset(x, y)
+
+
+    def toggle(self, x, y):
+        self.flush()
+        if self.display_list is None: return super().toggle(x, y)
+        if self.get(x, y): self.unset(x, y)
+        else:              self.set(x, y)
+
+
+    def set_text(self, x, y, text):
+        self.flush()
+        super().set_text(x, y, text)
+
+
+    def render(self, scale=1, min_x=None, min_y=None, max_x=None, max_y=None):
+        """Return a canvas with all drawn pixels within the bounds. Without a display
+        list, this is the turtle itself, which can only be rendered at scale 1."""
+        self.flush()
+        if self.display_list is None:
+            if scale != 1: raise ValueError('scaled frames require a display list')
+            return self
+
+        canvas = Canvas(self.line_ending)
+        self.display_list.rasterize(canvas, scale, min_x, min_y, max_x, max_y)
+        for x, y in self.erased:
+            if canvas.get(x, y): canvas.unset(x, y)
+        for row, cols in self.chars.items():
+            cells = canvas.chars[row]
+            for col, c in cols.items(): cells[col] = cells[col] | c if type(c) is int else c
+        return canvas
+
+
+    def get(self, x, y):
+        self.flush()
+        if super().get(x, y):         return True
+        if self.display_list is None: return False
+        x, y = iround(x), iround(y)
+        if (x, y) in self.erased: return False
+        canvas = Canvas()  # only the segments in the 1x1 window of the pixel are rasterized
+        self.display_list.rasterize(canvas, 1, x, y, x + 1, y + 1)
+        return canvas.get(x, y)
+
+
+    def rows(self, min_x=None, min_y=None, max_x=None, max_y=None, scale=1):
+        """Yields the lines of the frame, see :meth:`Canvas.rows`.
+
+        :param scale: (optional) scale of the drawing, requires a display list
+        """
+        canvas = self.render(scale, min_x, min_y, max_x, max_y)
+        if canvas is self: return super().rows(min_x, min_y, max_x, max_y)
+        else:              return canvas.rows(min_x, min_y, max_x, max_y)
+
+
+    def frame(self, min_x=None, min_y=None, max_x=None, max_y=None, scale=1):
+        """String representation of the turtle drawing, see :meth:`Canvas.frame`.
+
+        :param scale: (optional) scale of the drawing, requires a display list
+        """
+        ret = self.line_ending.join(self.rows(min_x, min_y, max_x, max_y, scale=scale))
+
+        if IS_PY2: return ret.encode('utf-8')
+        else:      return ret
+
+
+    def raster(self, min_x=None, min_y=None, max_x=None, max_y=None, invert=False):
+        canvas = self.render(1, min_x, min_y, max_x, max_y)
+        if canvas is self: return super().raster(min_x, min_y, max_x, max_y, invert)
+        else:              return canvas.raster(min_x, min_y, max_x, max_y, invert)
+
+
     # 2-letter aliases
     pu = up
     pd = down
@@ -15,33 +15,11 @@ except:
     exit(1)
 
 from drawille import Canvas
+from drawille.screen import TerminalSession
 from io import BytesIO
 import requests
 
 
-def getTerminalSize():
-    import os
-    env = os.environ
-
-    def ioctl_GWINSZ(fd):
-        import fcntl
-        import termios
-        import struct
-        cr = struct.unpack('hh', fcntl.ioctl(fd, termios.TIOCGWINSZ, '1234'))
-        return cr
-    cr = ioctl_GWINSZ(0) or ioctl_GWINSZ(1) or ioctl_GWINSZ(2)
-    if not cr:
-        try:
-            fd = os.open(os.ctermid(), os.O_RDONLY)
-            cr = ioctl_GWINSZ(fd)
-            os.close(fd)
-        except:
-            pass
-    if not cr:
-        cr = (env.get('LINES', 25), env.get('COLUMNS', 80))
-    return int(cr[1]), int(cr[0])
-
-
 def image2term(image, threshold=128, ratio=None, invert=False):
     if image.startswith('http://') or image.startswith('https://'):
         f = BytesIO(requests.get(image).content)
@@ -55,7 +33,7 @@ def image2term(image, threshold=128, ratio=None, invert=False):
         h = int(h * ratio)
         i = i.resize((w, h), Image.ANTIALIAS)
     else:
-        tw = getTerminalSize()[0]
+        tw = TerminalSession().size[0]
         tw *= 2
         if tw < w:
             ratio = tw / float(w)
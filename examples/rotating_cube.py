@@ -1,16 +1,8 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from drawille import Canvas, line
-import curses
+from drawille import Canvas, line, animate
 import math
-from time import sleep
-import locale
-
-locale.setlocale(locale.LC_ALL,"")
-
-stdscr = curses.initscr()
-stdscr.refresh()
 
 class Point3D:
     def __init__(self, x = 0, y = 0, z = 0):
@@ -67,12 +59,12 @@ vertices = [
 faces = [(0,1,2,3),(1,5,6,2),(5,4,7,6),(4,0,3,7),(0,4,5,1),(3,2,6,7)]
 
 
-def __main__(stdscr, projection=False):
+def __main__(projection=False):
     angleX, angleY, angleZ = 0, 0, 0
-    c = Canvas()
     while 1:
         # Will hold transformed vertices.
         t = []
+        frame = []
 
         for v in vertices:
             # Rotate the point around X axis, then around Y axis, and finally around Z axis.
@@ -84,28 +76,20 @@ def __main__(stdscr, projection=False):
             t.append(p)
 
         for f in faces:
-            for x,y in line(t[f[0]].x, t[f[0]].y, t[f[1]].x, t[f[1]].y):
-                c.set(x,y)
-            for x,y in line(t[f[1]].x, t[f[1]].y, t[f[2]].x, t[f[2]].y):
-                c.set(x,y)
-            for x,y in line(t[f[2]].x, t[f[2]].y, t[f[3]].x, t[f[3]].y):
-                c.set(x,y)
-            for x,y in line(t[f[3]].x, t[f[3]].y, t[f[0]].x, t[f[0]].y):
-                c.set(x,y)
-
-        f = c.frame(-40, -40, 80, 80)
-        stdscr.addstr(0, 0, '{0}\n'.format(f))
-        stdscr.refresh()
+            frame.extend(line(t[f[0]].x, t[f[0]].y, t[f[1]].x, t[f[1]].y))
+            frame.extend(line(t[f[1]].x, t[f[1]].y, t[f[2]].x, t[f[2]].y))
+            frame.extend(line(t[f[2]].x, t[f[2]].y, t[f[3]].x, t[f[3]].y))
+            frame.extend(line(t[f[3]].x, t[f[3]].y, t[f[0]].x, t[f[0]].y))
+
+        yield frame
 
         angleX += 2
         angleY += 3
         angleZ += 5
-        sleep(1.0/20)
-        c.clear()
 
 if __name__ == '__main__':
     from sys import argv
     projection = False
     if '-p' in argv:
         projection = True
-    curses.wrapper(__main__, projection)
+    animate(Canvas(), __main__, 1.0/20, projection, bounds=(-40, -40, 80, 80))
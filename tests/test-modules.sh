@@ -5,3 +5,4 @@ set -o xtrace   # print shell commands
 python -m drawille -h      > /dev/null
 python -m drawille --run rect
 
+printf "x,y\n1,2\n3,4\n" | python -m drawille plot > /dev/null
@@ -0,0 +1,56 @@
+from drawille import Turtle
+from drawille.display import DisplayList
+
+def draw(t):
+    for i in range(200):
+        t.forward(5 + i % 7)
+        t.right(37 if i % 3 else 90)
+    return t
+
+def test_same_pixels_as_canvas():
+    a, b = draw(Turtle()), draw(Turtle(display_list=DisplayList(block_size=8)))
+    assert a.frame() == b.frame()
+    assert a.frame(0, 0, 40, 40) == b.frame(0, 0, 40, 40)
+    assert b.get(b.pos_x, b.pos_y) and not b.get(1000, 1000)
+
+def test_scale():
+    a, b = Turtle(), Turtle(display_list=DisplayList())
+    for _ in range(4): a.forward(20); a.right(90)
+    for _ in range(4): b.forward(10); b.right(90)
+    assert a.frame() == b.frame(scale=2)
+    try: a.frame(scale=2); assert False, "scaling requires a display list"
+    except ValueError: pass
+
+def test_index():
+    d = DisplayList(block_size=4, group_size=3)
+    for i in range(100): d.add(i, 0, i + 1, 0)
+    assert len(d) == 100 and len(d.boxes) == 4 * 25 and len(d.groups) == 4 * 9
+    assert tuple(d.groups[-4:]) == (96, 0, 100, 0)
+    assert d.bounds() == (0, 0, 100, 0)
+    assert list(d.segments(10.5, -1, 11.5, 1)) == [(10, 0, 11, 0), (11, 0, 12, 0)]
+    assert list(d.segments(23.5, -1, 24.5, 1)) == [(23, 0, 24, 0), (24, 0, 25, 0)]  # across groups
+    assert len(list(d.segments())) == 100
+
+def test_unset_and_toggle():
+    a, b = Turtle(), Turtle(display_list=DisplayList())
+    for t in (a, b):
+        t.forward(10)
+        for x in range(4): t.unset(x, 0)
+        t.toggle(5, 0)
+        t.toggle(6, 1)
+    line = Turtle()
+    line.forward(10)
+    assert b.frame() == a.frame() != line.frame()
+    assert not b.get(2, 0) and not b.get(5, 0) and b.get(6, 1) and b.get(8, 0)
+    b.toggle(5, 0)
+    assert b.get(5, 0)
+    b.up(); b.move(0, 0); b.down(); b.forward(2)  # drawing over erased pixels draws them again
+    assert b.get(1, 0) and not b.get(3, 0)
+
+def test_clear_and_overlay():
+    t = draw(Turtle(display_list=DisplayList()))
+    t.clear()
+    assert len(t.display_list) == 0 and t.frame() == ''
+    t.set_text(0, 0, 'hi')
+    t.forward(10)
+    assert t.frame(scale=2).startswith('hi')
@@ -1,8 +1,13 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from drawille import Canvas, line, Turtle
+from drawille import Canvas, ConcurrentCanvas, line, Turtle
+from drawille.canvas import iline, polyline, quadratic_bezier, cubic_bezier, catmull_rom
+from drawille.canvas import export_frames
 from unittest import TestCase, main
+from array import array
+from threading import Thread
+import os, shutil, struct, subprocess, sys, tempfile, zlib
 
 
 class CanvasTestCase(TestCase):
@@ -74,6 +79,69 @@ class CanvasTestCase(TestCase):
         self.assertEqual(c.get(1, 1), False)
 
 
+    def test_to_pbm(self):
+        c = Canvas()
+        c.set(0, 0)
+        c.set(3, 5)
+        c.set_text(4, 0, 'a')
+        self.assertEqual(c.to_pbm(), b'P4\n6 8\n\x8c\x0c\x0c\x0c\x00\x10\x00\x00')
+        self.assertEqual(c.to_pbm(0, 0, 2, 4), b'P4\n2 4\n\x80\x00\x00\x00')
+
+
+    def test_to_png(self):
+        c = Canvas()
+        c.set(1, 2)
+        png = c.to_png()
+        self.assertEqual(png[:8], b'\x89PNG\r\n\x1a\n')
+        self.assertEqual(struct.unpack('>IIBB', png[16:26]), (2, 4, 1, 0))
+        size, = struct.unpack('>I', png[33:37])
+        self.assertEqual(png[37:41], b'IDAT')
+        rows = zlib.decompress(png[41:41+size])
+        self.assertEqual(rows, b'\x00\xc0\x00\xc0\x00\x80\x00\xc0')
+        self.assertRaises(ValueError, Canvas().to_png, 2, 0, 2, 4)
+
+
+    def test_empty_raster(self):
+        self.assertEqual(Canvas().raster(), (0, 0, []))
+        self.assertEqual(Canvas().to_pbm(), b'P4\n0 0\n')
+        self.assertRaises(ValueError, Canvas().to_png)
+        self.assertEqual(Canvas().raster(0, 0, 2, 4)[:2], (2, 4))  # bounds are kept
+
+
+    def test_export_frames(self):
+        def frames():
+            for i in range(3): yield [(i, 0)]
+
+        tmp = tempfile.mkdtemp()
+        try:
+            names = export_frames(Canvas(), frames, os.path.join(tmp, 'f{0}.pbm'), bounds=(0, 0, 4, 4))
+            self.assertEqual([os.path.basename(n) for n in names], ['f0.pbm', 'f1.pbm', 'f2.pbm'])
+            with open(names[1], 'rb') as f: self.assertEqual(f.read(), b'P4\n4 4\n\x40\x00\x00\x00')
+        finally:
+            shutil.rmtree(tmp)
+
+
+    def test_set_buffer(self):
+        points = [(0, 0), (3, 5), (10, 2), (7, 7)]
+        expected = Canvas()
+        for x, y in points: expected.set(x, y)
+
+        for fmt, code in (('ii', 'i'), ('hh', 'h'), ('ff', 'f')):
+            c = Canvas()
+            c.set_buffer(array(code, [v for p in points for v in p]).tobytes(), fmt)
+            self.assertEqual(c.frame(), expected.frame())
+
+        c = Canvas()  # records with an extra value
+        c.set_buffer(memoryview(array('i', [v for x, y in points for v in (x, y, 99)])), 'ii', stride=12)
+        self.assertEqual(c.frame(), expected.frame())
+
+        c = Canvas()
+        c.set_buffer(array('f', [1.4, 2.6]), 'ff')
+        self.assertTrue(c.get(1, 3))
+        self.assertRaises(ValueError, c.set_buffer, b'', 'dd')
+        self.assertRaises(ValueError, c.set_buffer, b'', 'ii', 6)
+
+
 class LineTestCase(TestCase):
 
 
@@ -93,6 +161,47 @@ class LineTestCase(TestCase):
         self.assertEqual(list(line(0, 0, 1, 1)), [(0, 0), (1, 1)])
 
 
+class CurveTestCase(TestCase):
+
+
+    def assertConnected(self, points):
+        for (x1, y1), (x2, y2) in zip(points, points[1:]):
+            self.assertTrue(max(abs(x2 - x1), abs(y2 - y1)) == 1, "gap or repeat between {0} and {1}".format((x1, y1), (x2, y2)))
+
+
+    def test_iline(self):
+        self.assertEqual(list(iline(0, 0, 0, 0)), [(0, 0)])
+        self.assertEqual(list(iline(0, 0, 3, 1)), [(0, 0), (1, 0), (2, 1), (3, 1)])
+        self.assertEqual(list(iline(0, 0, -2, -2)), [(0, 0), (-1, -1), (-2, -2)])
+
+
+    def test_polyline(self):
+        self.assertEqual(list(polyline([(0, 0), (2, 0), (2.2, 0), (2, 2)])), [(0, 0), (1, 0), (2, 0), (2, 1), (2, 2)])
+
+
+    def test_quadratic_bezier(self):
+        points = list(quadratic_bezier(0, 0, 20, 40, 40, 0))
+        self.assertEqual(points[0], (0, 0))
+        self.assertEqual(points[-1], (40, 0))
+        self.assertIn((20, 20), points)
+        self.assertConnected(points)
+
+
+    def test_cubic_bezier(self):
+        points = list(cubic_bezier(0, 0, 0, 30, 60, 30, 60, 0))
+        self.assertEqual(points[0], (0, 0))
+        self.assertEqual(points[-1], (60, 0))
+        self.assertIn((30, 22), points)
+        self.assertConnected(points)
+
+
+    def test_catmull_rom(self):
+        knots = [(0, 0), (10, 10), (20, 0), (30, 10)]
+        points = list(catmull_rom(knots))
+        for knot in knots: self.assertIn(knot, points)
+        self.assertConnected(points)
+
+
 class TurtleTestCase(TestCase):
 
 
@@ -128,5 +237,117 @@ class TurtleTestCase(TestCase):
         self.assertTrue(t.get(t.pos_x, t.pos_y))
 
 
+    def test_heading(self):
+        t = Turtle()
+        t.right(90)
+        t.forward(10)
+        self.assertEqual((t.pos_x, t.pos_y), (0, 10))
+        t.rotation = 240  # set directly, e.g., by an L-system
+        t.forward(2)
+        self.assertEqual((t.pos_x, t.pos_y), (-1, 10 - 3 ** 0.5))
+
+
+    def test_batched_segments(self):
+        t, c = Turtle(), Canvas()
+        for step, angle in [(10, 30), (7, 45), (13, 100), (5, 200)] * 5:
+            x, y = t.pos_x, t.pos_y
+            t.forward(step)
+            t.right(angle)
+            for px, py in line(x, y, t.pos_x, t.pos_y): c.set(px, py)
+        self.assertTrue(len(t.segments) > 0)
+        self.assertEqual(t.frame(), c.frame())
+        self.assertEqual(t.segments, [])
+
+
+class StatsTestCase(TestCase):
+
+    def test_counters(self):
+        c = Canvas()
+        stats = c.enable_stats()
+        c.set(0, 0)
+        c.set_pixels([(2, 0), (3, 0)])
+        c.unset(0, 0)
+        c.toggle(4, 4)
+        frame = c.frame()
+        self.assertEqual(stats.ops, {'set': 3, 'unset': 1, 'toggle': 1})
+        self.assertEqual((stats.frames, stats.rows, stats.cells), (1, 2, 2))
+        self.assertEqual(stats.bytes, len(frame.encode('utf-8')))
+        self.assertEqual(sum(stats.render_times), 1)
+
+    def test_hooks(self):
+        c = Canvas()
+        events = []
+        stats = c.enable_stats()
+        stats.add_hook(lambda event, canvas, **info: events.append((event, sorted(info))))
+        c.set(0, 0)
+        text = c.frame()
+        self.assertEqual(events, [('before_frame', []), ('before_rows', []),
+                                  ('after_rows', ['rows', 'seconds']),
+                                  ('after_frame', ['seconds', 'text'])])
+        c.disable_stats()
+        self.assertEqual(c.frame(), text)
+        self.assertEqual((stats.frames, len(events)), (1, 4))
+        self.assertNotIn('set', c.__dict__)
+
+
+class ConcurrentCanvasTestCase(TestCase):
+
+    def test_concurrent_producers(self):
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)  # switch threads as often as possible
+        try:
+            c, done, errors = ConcurrentCanvas(stripes=4), [], []
+            def produce(i):
+                # all producers set pixels in the same cells
+                for y in range(40):
+                    c.set_pixels((x, y) for x in range(i, 80, 4))
+                    for x in range(i, 80, 8): c.set(x, y + 40)
+            def render():
+                try:
+                    while not done: c.frame(); c.snapshot()
+                except Exception as err:
+                    errors.append(err)
+            threads = [Thread(target=produce, args=(i,)) for i in range(4)]
+            renderer = Thread(target=render)
+            renderer.start()
+            for t in threads: t.start()
+            for t in threads: t.join()
+            done.append(True)
+            renderer.join()
+        finally:
+            sys.setswitchinterval(interval)
+
+        expected = Canvas()
+        for y in range(40):
+            for x in range(80): expected.set(x, y)
+            for x in range(80):
+                if x % 8 < 4: expected.set(x, y + 40)
+        self.assertEqual(errors, [])
+        self.assertEqual(c.frame(), expected.frame())
+
+    def test_snapshot(self):
+        c = ConcurrentCanvas()
+        c.set(0, 0)
+        s = c.snapshot()
+        c.set(1, 0)
+        self.assertEqual(s.frame(), '⠁')
+        self.assertEqual(c.frame(), '⠉')
+
+
+class ImportTestCase(TestCase):
+
+    def test_lazy_imports(self):
+        code = ('import sys; from drawille import Canvas, Turtle; '
+                'print(",".join(m for m in ("lark", "prompt_toolkit", "pygments", "curses") if m in sys.modules))')
+        out = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEqual(out.strip(), b'')
+
+    def test_lazy_attributes(self):
+        import drawille
+        from drawille.repl import Turtille
+        self.assertIs(drawille.Turtille, Turtille)
+        self.assertRaises(AttributeError, getattr, drawille, 'nothing')
+
+
 if __name__ == '__main__':
     main()
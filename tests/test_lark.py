@@ -1,4 +1,4 @@
-from drawille.repl import Turtille
+from drawille.repl import Turtille, turtille_parser
 import logging
 
 def test_repl():
@@ -39,6 +39,37 @@ def test_repl():
     r 1 - 2  -- `q1` 'q2' \"q3\".
     """)
 
+def test_shared_parser():
+    assert Turtille()._lark is Turtille()._lark is turtille_parser()
+
+def test_parse_program():
+    repl = Turtille()
+    program = repl.parse("""
+    rect -> f 2 r 90
+    rec45 -> rect r 45   # names starting with a movement
+    8 * rec45
+    g 10 -4
+    move (1 + 2) 3
+    animate f r
+    """)
+    assert 'rec45' in repl.funcs
+    assert program == [
+        ('repeat', (8, (('rec45', ()),))),
+        ('move', (10, -4)),
+        ('move', (3, 3)),
+        ('animate', (None, None, ('f', (20,)), ('r', (45,)))),
+    ]
+
 if __name__ == '__main__':
     logging.basicConfig(level=logging.DEBUG)
     test_repl()
+
+def test_keywords_as_names():
+    repl = Turtille(use_cache=False)
+    assert repl.parse('lsystem -> f 1\nlsystem\nprofile f 1') == [
+        ('lsystem', ()),
+        ('profile', ((('f', (1,)),),)),
+    ]
+    assert repl.format_func('lsystem') == 'lsystem -> f (1,)'
+    repl.parse('lsystem koch "F" "F=F+F-F-F+F" 90 2')
+    assert 'koch' in repl.lsystems
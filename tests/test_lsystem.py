@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from drawille import Turtle
+from drawille.lsystem import LSystem
+from unittest import TestCase, main
+
+
+def rewrite(axiom, rules, depth):
+    for _ in range(depth): axiom = ''.join(rules.get(c, c) for c in axiom)
+    return axiom
+
+
+class LSystemTestCase(TestCase):
+
+
+    def test_expand(self):
+        rules = {'X': 'X+YF+', 'Y': '-FX-Y'}
+        system = LSystem('FX', rules)
+        for depth in range(6):
+            self.assertEqual(''.join(system.expand(depth)), rewrite('FX', rules, depth))
+
+
+    def test_draw(self):
+        t = Turtle()
+        LSystem('F[+F]F', {}, angle=90, step=2).draw(t, 0)
+        self.assertEqual((t.pos_x, t.pos_y, t.rotation), (4, 0, 0))
+        self.assertTrue(t.get(2, 2))
+        self.assertTrue(t.get(4, 0))
+
+
+    def test_jump(self):
+        t = Turtle()
+        LSystem('FfF', {}, step=2).draw(t, 0)
+        self.assertTrue(t.get(1, 0))
+        self.assertFalse(t.get(3, 0))
+        self.assertTrue(t.get(5, 0))
+        self.assertTrue(t.brush_on)
+
+
+    def test_parse_rules(self):
+        self.assertEqual(LSystem.parse_rules(['F=F+F', 'X=']), {'F': 'F+F', 'X': ''})
+        self.assertRaises(ValueError, LSystem.parse_rules, ['FF=F'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from drawille import Canvas, Plot, DensityCanvas
+from drawille.stream import StreamPlot, parse_text, records, text_records, typecode, INT32, FLOAT32
+from unittest import TestCase, main
+from array import array
+from io import BytesIO
+import math
+
+
+class PlotTestCase(TestCase):
+
+
+    def test_points_match_canvas(self):
+        xs = [i / 10.0 for i in range(5000)]
+        ys = [20 + math.sin(x) * 20 for x in xs]
+        c = Canvas()
+        for x, y in zip(xs, ys): c.set(x, y)
+
+        p = Plot()
+        p.add(xs[:1234], ys[:1234])
+        p.add(xs[1234:], ys[1234:])
+        self.assertEqual(p.count, len(xs))
+        self.assertEqual(p.frame(), c.frame())
+
+
+    def test_minmax_columns(self):
+        p = Plot(mode='minmax')
+        p.add([0, 0, 0, 1], [3, 0, 1, 5])
+        self.assertEqual(p.columns, {0: (0, 3), 1: (5, 5)})
+        c = p.draw()
+        self.assertTrue(all(c.get(0, y) for y in range(4)))
+        self.assertFalse(c.get(0, 4))
+
+
+    def test_series_scale(self):
+        p = Plot(x_scale=0.5)
+        p.add_series([1] * 10)
+        p.add_series([2] * 10)
+        self.assertEqual(p.count, 20)
+        self.assertEqual(sorted(p.pixels), [(x, 1) for x in range(5)] + [(x, 2) for x in range(5, 11)])
+
+
+    def test_invalid_mode(self):
+        self.assertRaises(ValueError, Plot, mode='bars')
+
+
+class DensityCanvasTestCase(TestCase):
+
+
+    def test_threshold(self):
+        c = DensityCanvas(10, 8, threshold=2)
+        c.add([0, 0, 1, 20], [0, 0, 1, 0])
+        self.assertEqual(c.counts[0], 2)
+        self.assertTrue(c.get(0, 0))
+        self.assertFalse(c.get(1, 1))
+        self.assertEqual(c.frame(), '⠁')
+
+
+    def test_decay(self):
+        c = DensityCanvas(4, 4)
+        c.hit(1, 1, 4)
+        c.decay(0.5)
+        self.assertEqual(c.counts[5], 2)
+        c.threshold = 3
+        self.assertFalse(c.get(1, 1))
+
+
+    def test_dither(self):
+        c = DensityCanvas(2, 4, dither=True)
+        c.add([0] * 8 + [1], [0] * 8 + [3])
+        self.assertEqual(c.frame(), '⠁')
+        c.hit(1, 3, 7)
+        self.assertEqual(c.frame(), '⢁')
+        self.assertTrue(c.get(0, 0))
+        c.hit(1, 0, 1000)  # a new highest count must not use the cached limit
+        self.assertFalse(c.get(0, 0))
+        self.assertEqual(c.frame(), '⠈')
+
+
+    def test_large_counts(self):
+        c = DensityCanvas(2, 4)
+        c.hit(0, 0, 2 ** 24)
+        c.add([0], [0])
+        self.assertEqual(c.counts[0], 2 ** 24 + 1)  # float32 counts saturate at 2**24
+
+
+    def test_text(self):
+        c = DensityCanvas(4, 4)
+        c.set(0, 0)
+        c.set_text(2, 0, 'a')
+        self.assertEqual(c.frame(), '⠁a')
+        self.assertTrue(c.get(2, 0))
+
+
+    def test_raster(self):
+        c, expected = DensityCanvas(4, 4, threshold=2), Canvas()
+        c.add([0, 0, 3, 3, 1], [0, 0, 3, 3, 1])
+        expected.set(0, 0); expected.set(3, 3)
+        self.assertEqual(c.to_pbm(), expected.to_pbm())  # rendered without a frame
+        c.hit(1, 1)
+        expected.set(1, 1)
+        self.assertEqual(c.to_png(), expected.to_png())  # not the stale rendering
+
+
+
+class StreamTestCase(TestCase):
+
+
+    def test_text_records(self):
+        data = [b'x,y\n1,2\n3,', b'4\n5 6\n7 ', b'8']  # header and records split across chunks
+        values = [v for chunk in text_records(iter(data)) for v in chunk]
+        self.assertEqual(values, [1, 2, 3, 4, 5, 6, 7, 8])
+
+
+    def test_incomplete_records(self):
+        self.assertEqual(list(parse_text(b'1 2 3\n4\n5 6\n7 8\n')), [5, 6, 7, 8])  # even number of values
+        self.assertEqual(list(parse_text(b'1\n2\n3\n', width=1)), [1, 2, 3])
+
+
+    def test_non_finite_records(self):
+        self.assertEqual(list(parse_text(b'1 2\nnan 3\n4 inf\n5 1e999\n6 7\n')), [1, 2, 6, 7])
+        data = array('f', [1, 2, float('nan'), 3, 4, float('-inf'), 5, 6]).tobytes()
+        values = [v for chunk in records(BytesIO(data), FLOAT32) for v in chunk]
+        self.assertEqual(values, [1, 2, 5, 6])
+        s = StreamPlot()
+        for chunk in records(BytesIO(b'1 2\nnan 3\n')): s.add(chunk)
+        self.assertEqual(s.count, 1)
+        self.assertTrue(s.draw().frame().strip())  # nan values must not reach the plot
+
+
+    def test_binary_records(self):
+        data = array(typecode(INT32), [1, 2, 3, 4, 5, 6]).tobytes()
+        values = [v for chunk in records(BytesIO(data), INT32, chunk_size=5) for v in chunk]
+        self.assertEqual(values, [1, 2, 3, 4, 5, 6])
+        data = array('f', [0.5, 1.5, 2.5, 3.5]).tobytes()
+        values = [v for chunk in records(BytesIO(data), FLOAT32, chunk_size=3) for v in chunk]
+        self.assertEqual(values, [0.5, 1.5, 2.5, 3.5])
+
+
+    def test_window(self):
+        s = StreamPlot(window=3, series=True)
+        for chunk in ([0, 1], [2, 3, 4], [5, 6]):
+            s.add(array('d', chunk))
+        self.assertEqual(len(s.chunks), 2)
+        c = Canvas()
+        for x, y in enumerate((4, 5, 6)): c.set(x, y)
+        self.assertEqual(s.draw().frame(), c.frame())
+
+
+if __name__ == '__main__':
+    main()
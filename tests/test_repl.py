@@ -18,7 +18,7 @@ def test_imports():
 def test_run_command():
     logging.basicConfig(level=logging.DEBUG)
 
-    tur = Turtille()
+    tur = Turtille(use_cache=False)  # the test must not leave cache files in the tests directory
     print("funcs:", list(tur.funcs))
     assert 'rect' in tur.funcs
 
@@ -41,5 +41,59 @@ def test_run_command():
     tur.run('f 10 testrect')
     tur.print_frame()  # output: two rects: [][]
 
+def test_undo_redo():
+    tur = Turtille(use_cache=False)
+
+    def state():
+        t = tur.turtle
+        return t.frame(), t.pos_x, t.pos_y, t.rotation
+
+    def step(text):
+        tur.run_undoable(tur.parse(text))
+        states.append(state())
+
+    states = [state()]
+    step('f 10 r 90')
+    tur.turtle.enable_stats()  # steps must work with methods wrapped by the stats
+    step('f 20')
+    step('clear')              # must use the clear method wrapped by the history
+    step('f 10 rect')
+    step('profile rect r 45 f 5')
+    assert states[3][0] == '' and states[2][0] != ''
+
+    for expected in reversed(states[:-1]):
+        tur.run_undoable(tur.parse('undo'))
+        assert state() == expected
+    tur.run_undoable(tur.parse('undo'))  # nothing to undo
+    assert state() == states[0]
+
+    for expected in states[1:]:
+        tur.run_undoable(tur.parse('redo'))
+        assert state() == expected
+    assert 'set_pixels' in tur.turtle.__dict__ and tur.turtle.stats.ops['set'] > 0
+
+    tur.run_undoable(tur.parse('undo undo'))
+    tur.run_undoable(tur.parse('b 10'))  # a new command drops the undone steps
+    assert tur.changes.redo() is False
+    assert len(tur.changes.undo_steps) == 4
+
+def test_cached_completer():
+    tur = Turtille(use_cache=False)
+    assert tur.completer is None
+    tur.completer = completer = object()
+    tur.run_undoable(tur.parse('f 10'))
+    assert tur.completer is completer
+    tur.run_undoable(tur.parse('fx -> f 10'))  # new commands require a new completer
+    assert tur.completer is None
+
+def test_animate(capsys):
+    import time
+    tur = Turtille(use_cache=False)
+    start = time.time()
+    tur.run('animate 5 fps 50 f 10 r 90')  # frames are printed without a terminal
+    assert time.time() - start >= 4 / 50.0
+    assert (round(tur.turtle.pos_x), round(tur.turtle.pos_y), tur.turtle.rotation) == (10, 0, 450)
+    assert capsys.readouterr().out.count(tur.turtle.frame()) == 2  # after the 4th and 5th frame
+
 
 if __name__ == '__main__': test_run_command()
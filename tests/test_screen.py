@@ -0,0 +1,82 @@
+from drawille import Turtle, DensityCanvas
+from drawille.display import DisplayList
+from drawille.screen import Region, TerminalSession, diff_line, extent
+from io import StringIO
+import os, signal
+
+
+def test_diff_line():
+    assert diff_line('abc', 'abc') is None
+    assert diff_line('abcd', 'aXcd') == (1, 'X', False)
+    assert diff_line('abc', 'abcde') == (3, 'de', False)
+    assert diff_line('abcde', 'ab') == (2, '', True)
+    assert diff_line('', 'ab') == (0, 'ab', False)
+
+
+def test_region_updates_changed_cells():
+    out = StringIO()
+    region = Region(out, reserve=2, size=(10, 6))
+    t = Turtle()
+    t.forward(6)
+    region.update(t.rows())
+    setup = out.getvalue()
+    assert setup.startswith('\x1b[2J\x1b[5;6r')  # drawing in lines 1-4, scrolling in lines 5-6
+    assert '\x1b[1;1H' + t.frame() in setup
+
+    assert region.update(t.rows()) == 0  # nothing changed
+    t.right(90)
+    t.forward(8)
+    out.truncate(0); out.seek(0)
+    region.update(t.rows())
+    changes = out.getvalue()
+    assert changes.startswith('\x1b7') and changes.endswith('\x1b8')
+    assert '\x1b[1;' not in changes.replace('\x1b[1;4H', '')  # only the corner cell in line 1 changed
+    assert region.lines == t.frame().split('\n')[:4]
+
+    t.clear()
+    region.update(t.rows())
+    assert region.lines == []
+    region.end()
+    assert out.getvalue().endswith('\x1b[r\x1b[6;1H')
+
+
+def test_session_fit():
+    t = Turtle()
+    t.move(-10, -10)
+    t.move(100, 30)
+    session = TerminalSession(reserve=1, size=(20, 6))
+    assert session.viewport() == (0, 0, 40, 20)
+    assert session.fit(t) == (-10, -12, 30, 8)             # starts at the drawing, clipped to 20x5 cells
+    assert session.fit(t, 1, 2, 10, 10) == (0, 0, 10, 10)  # aligned to cells
+    assert len(t.frame(*session.fit(t)).split('\n')) == 5
+    assert session.fit(Turtle()) == (0, 0, 40, 20)
+
+
+def test_extent():
+    t = Turtle(display_list=DisplayList())
+    t.move(-10, -10)
+    t.move(12, 7)
+    t.set_text(20, 12, 'ab')
+    assert extent(t) == (-10, -12, 24, 16)  # segments of the display list and text cells
+    assert extent(Turtle(display_list=DisplayList())) is None
+
+    c = DensityCanvas(8, 8)
+    c.hit(3, 5)
+    assert extent(c) == (2, 4, 4, 8)  # rendered from the counts
+    assert TerminalSession(size=(20, 6)).fit(c) == (2, 4, 4, 8)
+
+
+def test_session_resize():
+    calls = []
+    previous = signal.signal(signal.SIGWINCH, lambda *args: calls.append(args))
+    try:
+        with TerminalSession() as session:
+            size = session.size
+            assert not session.stale
+            os.kill(os.getpid(), signal.SIGWINCH)
+            assert session.stale and len(calls) == 1  # the previous handler is still called
+            assert session.size == size and not session.stale
+        os.kill(os.getpid(), signal.SIGWINCH)
+        assert len(calls) == 2
+    finally:
+        signal.signal(signal.SIGWINCH, previous)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from drawille import Canvas
+from drawille.shapes import TemplateCache, polygon_template, circle_template
+from unittest import TestCase, main
+
+
+class TemplateTestCase(TestCase):
+
+
+    def test_stamp_matches_set(self):
+        t = polygon_template(sides=6, radius=5, fill=True)
+        for x, y in ((0, 0), (7, 3), (-5, 10), (13, -2)):
+            c1, c2 = Canvas(), Canvas()
+            t.stamp(c1, x, y)
+            for px, py in t.pixels(x, y): c2.set(px, py)
+            self.assertEqual(c1.chars, c2.chars)
+
+
+    def test_memoized(self):
+        self.assertIs(polygon_template(5, 3), polygon_template(5, 3))
+        self.assertIsNot(polygon_template(5, 3), polygon_template(5, 3, rotation=10))
+
+
+    def test_lru(self):
+        cache = TemplateCache(maxsize=2)
+        a = circle_template(2, cache=cache)
+        circle_template(3, cache=cache)
+        circle_template(2, cache=cache)  # refresh a
+        circle_template(4, cache=cache)  # evicts radius 3
+        self.assertEqual(list(cache.templates), [('circle', 2, False), ('circle', 4, False)])
+        self.assertIs(circle_template(2, cache=cache), a)
+
+
+    def test_circle(self):
+        outline = circle_template(3).offsets
+        self.assertTrue({(3, 0), (-3, 0), (0, 3), (0, -3)} <= outline)
+        self.assertNotIn((0, 0), outline)
+        self.assertIn((0, 0), circle_template(3, fill=True).offsets)
+        self.assertTrue(outline <= circle_template(3, fill=True).offsets)
+
+
+if __name__ == '__main__':
+    main()
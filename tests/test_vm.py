@@ -0,0 +1,237 @@
+import drawille.repl
+from drawille.repl import BaseVM, Turtille, TurtilleError
+import logging
+
+def new_vm():
+    tur = BaseVM()
+    tur.add_func('fr90', [('f', (20,)), ('r', (90,))])
+    tur.add_func('rect', [('repeat', (4, (('fr90',),)))])
+    tur.add_func('rec45', [('rect',), ('r', (45,))])
+    return tur
+
+def test_compiled_matches_traced():
+    log = logging.getLogger('drawille.repl')
+    level = log.level
+    frames = []
+    for lvl in (logging.DEBUG, logging.INFO):
+        log.setLevel(lvl)
+        tur = new_vm()
+        tur.run_program([('repeat', (8, (('rec45',),))), ('f', (5,))])
+        frames.append(tur.turtle.frame())
+    log.setLevel(level)
+    assert frames[0] == frames[1]
+    assert frames[0] != ''
+
+def test_inlining():
+    tur = new_vm()
+    ops = tur.compile_func('rec45')
+    assert len(ops) == 2  # rect loop + right
+    assert tur.compile_func('rec45') is ops
+    assert tur.compile_command('f', (3,))[0].args == (3,)
+
+def test_redefinition():
+    tur = new_vm()
+    tur.compile_func('rect')
+    tur.add_func('fr90', [('f', (10,)), ('r', (90,))])
+    assert tur.compiled == {}
+    tur.run_program([('rect', ())])
+    assert tur.turtle.get(10, 0) and not tur.turtle.get(20, 0)
+
+def test_recursion_and_undefined():
+    tur = new_vm()
+    tur.add_func('self', [('f', (1,)), ('self',)])
+    ops = tur.compile_func('self')
+    assert len(ops) == 2
+    tur.add_func('later', [('missing',)])
+    try: tur.run_program([('later', ())]); assert False, "undefined commands must fail when run"
+    except KeyError: pass
+
+def test_inlining_budget():
+    tur = new_vm()
+    tur.add_func('a0', [('f', (1,)), ('r', (1,))])
+    for i in range(1, 25): tur.add_func('a%d' % i, [('a%d' % (i - 1), ()), ('a%d' % (i - 1), ())])
+    assert len(tur.compile_func('a24')) <= 2 * tur.max_inline_ops  # instead of 2 ** 25 ops
+    assert max(len(ops) for ops in tur.compiled.values()) <= 2 * tur.max_inline_ops
+
+    frames = []
+    for budget in (8, 10 ** 6):
+        tur.max_inline_ops = budget
+        tur.invalidate()
+        tur.turtle.clear()
+        tur.run_program([('a12', ())])
+        frames.append(tur.turtle.frame())
+    assert frames[0] == frames[1]
+
+def test_turtille_compiled():
+    tur = Turtille()
+    tur.run('fr2 -> f 2 r 90')
+    tur.run('4 * fr2')
+    assert tur.turtle.get(2, 2)
+
+def test_deep_nesting():
+    tur = new_vm()
+    tur.add_func('n0', [('f', (1,))])
+    for i in range(1, 3000): tur.add_func('n%d' % i, [('n%d' % (i - 1), ()), ('r', (0,))])
+    tur.run_program([('n2999', ())])
+    assert tur.turtle.pos_x == 1
+
+def test_depth_limit():
+    tur = new_vm()
+    tur.max_depth = 50
+    tur.add_func('deep', [('f', (1,)), ('deep', ()), ('r', (1,))])
+    try: tur.run_program([('deep', ())]); assert False, "recursion must be limited"
+    except TurtilleError: pass
+
+def test_pause_and_resume():
+    tur = new_vm()
+    tur.add_func('spin', [('r', (1,)), ('spin', ())])  # endless tail recursion
+    execution = tur.execute([('spin', ())])
+    assert not execution.run(budget=1000)
+    assert execution.steps == 1000 and execution.depth == 1
+    assert not execution.run(budget=1000)
+    assert execution.steps == 2000 and tur.turtle.rotation == 1000
+
+    tur = new_vm()
+    execution = tur.execute([('repeat', (3, (('f', (1,)),)))])
+    assert not execution.run(budget=3)  # exec, loop, forward
+    assert tur.turtle.pos_x == 1
+    assert execution.run(budget=2)
+    assert execution.done and tur.turtle.pos_x == 3
+
+def test_step_budget():
+    tur = new_vm()
+    tur.max_steps = 10
+    try: tur.run_program([('repeat', (100, (('f', (1,)),)))]); assert False, "budget must be enforced"
+    except TurtilleError: pass
+
+def test_lsystem():
+    tur = Turtille()
+    tur.run('lsystem koch "F" "F=F+F-F-F+F" 90 2')
+    assert tur.format_func('koch') == 'lsystem koch "F" "F=F+F-F-F+F" 90 2'
+    assert 'koch' in tur.definitions()
+    tur.run('koch 2')
+    assert tur.turtle.pos_x == 18
+    tur.run('koch -> f 1')
+    assert 'koch' not in tur.lsystems
+
+def test_memoize():
+    frames, steps = [], []
+    for memoize in (False, True):
+        tur = Turtille()
+        tur.memoize = memoize
+        tur.run('x3 -> f 3 r 45 f 1.5 l 90')
+        tur.run('r7f5 -> r 7 f 5')
+        tur.run('r90f4 -> r 90 f 4')
+        tur.run('star -> repeat 8 x3')
+        for i in range(3): tur.run('circles r 10 star f 7 r 33 star')
+        tur.run('repeat 500 r7f5')
+        execution = tur.execute(tur.parse('reset ' + 'star f 10 ' * 6 + 'repeat 500 r90f4'))
+        assert execution.run()
+        frames.append(tur.turtle.frame())
+        steps.append(execution.steps)
+        if memoize: assert len(tur.memo) > 0
+    assert frames[0] == frames[1]
+    assert steps[1] < steps[0] / 10  # repeated stars are stamped and the loop stops after one cycle
+
+def test_memoize_budget():
+    tur = Turtille()
+    tur.memoize = True
+    tur.run('spiral -> repeat 200 f 1 r 1')
+    tur.max_steps = 100
+    try: tur.run('spiral'); assert False, "the budget must be enforced in memoized functions"
+    except TurtilleError: pass
+    assert tur.turtle.recording is None and len(tur.memo) == 0  # the unfinished call is not memoized
+
+    tur.max_steps = None
+    tur.reset()
+    execution = tur.execute(tur.parse('spiral'))
+    assert not execution.run(budget=50)  # pauses in the memoized function
+    assert execution.depth > 1 and tur.turtle.recording is not None
+    while not execution.run(budget=50): pass
+    assert tur.turtle.recording is None and len(tur.memo) == 1
+    frame = tur.turtle.frame()
+    tur.turtle.clear()
+    tur.reset()
+    execution = tur.execute(tur.parse('spiral'))
+    assert execution.run(budget=2) and tur.turtle.frame() == frame  # stamped in one step
+
+def test_memo_loop_stops_early():
+    frames = []
+    for memoize in (False, True):
+        tur = Turtille()
+        tur.memoize = memoize
+        tur.add_command('count', lambda: None)
+        tur.run('r90f4 -> r 90 f 4')
+        tur.run('repeat 1000 r90f4')
+        frames.append(tur.turtle.frame())
+    assert frames[0] == frames[1]
+    assert tur.turtle.rotation == 4 * 90  # stopped after the first cycle
+    assert tur.is_drawing('r90f4') and not tur.is_drawing(program=[('count', ())])
+    assert tur.is_drawing(program=[('clear', ()), ('r90f4', ())], loop=True)
+
+def test_load_cache(tmpdir):
+    source = tmpdir.join('lib.tur')
+    source.write('box -> repeat 4 f 10 r 90\nlsystem koch "F" "F=F+F-F-F+F" 90 2\nbox\n')
+    frames = []
+    for _ in range(2):
+        tur = Turtille()
+        program = tur.load(str(source))
+        assert program == [('box', ())]
+        assert 'box' in tur.funcs and 'koch' in tur.lsystems
+        tur.run_program(program)
+        frames.append(tur.turtle.frame())
+    assert frames[0] == frames[1]
+    assert tmpdir.join('__turcache__', 'lib.tur.json').check()
+
+    # changed sources must not use the stale cache entry
+    source.write('box -> repeat 3 f 10 r 120\n')
+    tur = Turtille()
+    assert tur.load(str(source)) == []
+    fresh = Turtille()
+    fresh.parse(source.read())
+    assert tur.format_func('box') == fresh.format_func('box')
+
+def test_load_skips_bad_lines(tmpdir, caplog):
+    source = tmpdir.join('old.tur')
+    source.write('box -> f 2\nprofile -> f 1\nlsystem -> f 3\nbox\n')
+    tur = Turtille(use_cache=False)
+    assert tur.load(str(source)) == [('box', ())]  # the other lines are loaded
+    assert 'box' in tur.funcs and 'lsystem' in tur.funcs
+    assert 'skipped line 2' in caplog.text
+
+def test_implicit_load_cache(tmpdir, monkeypatch):
+    monkeypatch.chdir(tmpdir)
+    tmpdir.join('.turtille').write('box -> repeat 4 f 10 r 90\n')
+    assert 'box' in Turtille().funcs
+    assert not tmpdir.join('__turcache__').check()  # creating a Turtille never writes files
+
+    cache_dir = tmpdir.mkdir('cache')
+    tur = Turtille(cache_dir=str(cache_dir))
+    tur.load()
+    assert len(cache_dir.listdir()) == 1
+    entry = cache_dir.listdir()[0]
+    key = entry.read()
+
+    # a new cache format invalidates the entry, even if the grammar did not change
+    monkeypatch.setattr(drawille.repl, 'cache_format', drawille.repl.cache_format + '.test')
+    tur = Turtille(cache_dir=str(cache_dir))
+    tur.load()
+    assert 'box' in tur.funcs and entry.read() != key
+
+def test_profile():
+    tur = new_vm()
+    profiler = tur.run_profiled([('rec45', ()), ('f', (5,))])
+    stats = profiler.to_dict()
+    assert sorted(stats['functions']) == ['fr90', 'rec45', 'rect']
+    assert stats['functions']['fr90']['calls'] == 4
+    assert stats['commands']['f']['calls'] == 5
+    rec45, f = stats['functions']['rec45'], stats['commands']['f']
+    assert f['pixels'] > rec45['pixels'] > 0
+    assert rec45['cumulative'] >= rec45['self']
+    assert 'rect ->' in profiler.format()
+
+    # profiling leaves no compiled functions behind and draws the same frame
+    assert tur.profiler is None and all(key[2] is None for key in tur.compiled)
+    other = new_vm()
+    other.run_program([('rec45', ()), ('f', (5,))])
+    assert tur.turtle.frame() == other.turtle.frame()